@@ -0,0 +1,240 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+from fastapi import HTTPException, status
+from gridfs import AsyncGridFSBucket
+from gridfs.errors import FileExists, NoFile
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import API_BASE_URL, BLOB_BACKEND, BLOB_STORAGE_DIR
+from app.core.database import LazyCollection, get_database
+
+BLOB_PATH_PREFIX = '/blobs/'
+CHUNK_SIZE = 256 * 1024
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# Uploads are served back from the API origin, so only types a browser will not run as a page are
+# accepted: raster images (no SVG), plus PDFs for template assets.
+IMAGE_CONTENT_TYPES = frozenset(
+    {'image/png', 'image/jpeg', 'image/jpg', 'image/gif', 'image/webp', 'image/avif', 'image/bmp', 'image/tiff'}
+)
+TEMPLATE_ASSET_CONTENT_TYPES: Dict[str, FrozenSet[str]] = {
+    'image': IMAGE_CONTENT_TYPES,
+    'pdf': frozenset({'application/pdf'}),
+}
+
+
+def write_atomic(path: Path, data: bytes, mode: Optional[int] = None) -> None:
+    # Readers (and anything serving the directory) only ever see a complete file.
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class BlobInfo(NamedTuple):
+    digest: str
+    content_type: str
+    length: int
+
+
+async def _read_range(
+    read: Callable[[int], Awaitable[bytes]], length: Optional[int]
+) -> AsyncIterator[bytes]:
+    remaining = length
+    while remaining is None or remaining > 0:
+        chunk = await read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+class GridFSBlobBackend:
+    def __init__(self) -> None:
+        self.files = LazyCollection('blobs.files')
+        self._database = None
+        self._bucket: Optional[AsyncGridFSBucket] = None
+
+    @property
+    def bucket(self) -> AsyncGridFSBucket:
+        database = get_database()
+        if self._database is not database:
+            self._database, self._bucket = database, AsyncGridFSBucket(database, bucket_name='blobs')
+        return self._bucket
+
+    async def info(self, digest: str) -> Optional[BlobInfo]:
+        doc = await self.files.find_one({'_id': digest}, {'length': 1, 'metadata': 1})
+        if not doc:
+            return None
+        return BlobInfo(digest, (doc.get('metadata') or {}).get('content_type', 'application/octet-stream'), doc['length'])
+
+    async def put(self, digest: str, content_type: str, data: bytes) -> None:
+        try:
+            await self.bucket.upload_from_stream_with_id(digest, digest, data, metadata={'content_type': content_type})
+        except (DuplicateKeyError, FileExists):
+            # A concurrent upload of the same bytes won the race; content addressing makes it identical.
+            pass
+
+    async def iter_chunks(self, digest: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        try:
+            stream = await self.bucket.open_download_stream(digest)
+        except NoFile:
+            return
+        try:
+            if offset:
+                await stream.seek(offset)
+            async for chunk in _read_range(stream.read, length):
+                yield chunk
+        finally:
+            await stream.close()
+
+
+class FilesystemBlobBackend:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def _info(self, digest: str) -> Optional[BlobInfo]:
+        path = self._path(digest)
+        try:
+            meta = json.loads(path.with_suffix('.json').read_text())
+            length = path.stat().st_size
+        except (OSError, ValueError):
+            return None
+        return BlobInfo(digest, meta.get('content_type', 'application/octet-stream'), length)
+
+    async def info(self, digest: str) -> Optional[BlobInfo]:
+        return await asyncio.to_thread(self._info, digest)
+
+    def _put(self, digest: str, content_type: str, data: bytes) -> None:
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, data)
+        # The metadata file is written last so a blob is only visible once its bytes are complete.
+        write_atomic(path.with_suffix('.json'), json.dumps({'content_type': content_type}).encode('utf-8'))
+
+    async def put(self, digest: str, content_type: str, data: bytes) -> None:
+        await asyncio.to_thread(self._put, digest, content_type, data)
+
+    async def iter_chunks(self, digest: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        try:
+            handle = await asyncio.to_thread(self._path(digest).open, 'rb')
+        except OSError:
+            return
+        try:
+            if offset:
+                handle.seek(offset)
+            async for chunk in _read_range(lambda size: asyncio.to_thread(handle.read, size), length):
+                yield chunk
+        finally:
+            handle.close()
+
+
+def _create_backend():
+    if BLOB_BACKEND == 'filesystem':
+        return FilesystemBlobBackend(BLOB_STORAGE_DIR)
+    return GridFSBlobBackend()
+
+
+blob_backend = _create_backend()
+
+
+def parse_data_url(value: str) -> Optional[Tuple[str, bytes]]:
+    if not value.startswith('data:') or ',' not in value:
+        return None
+    header, body = value[5:].split(',', 1)
+    params = header.split(';')
+    content_type = params[0].strip().lower() or 'text/plain'
+    try:
+        if 'base64' in params[1:]:
+            data = base64.b64decode(body, validate=True)
+        else:
+            data = unquote_to_bytes(body)
+    except (binascii.Error, ValueError):
+        return None
+    return content_type, data
+
+
+async def store_blob(data: bytes, content_type: str) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    if await blob_backend.info(digest) is None:
+        await blob_backend.put(digest, content_type, data)
+    return digest
+
+
+def blob_path(digest: str) -> str:
+    return f'{BLOB_PATH_PREFIX}{digest}'
+
+
+def _strip_api_base_url(value: str) -> str:
+    if API_BASE_URL and value.startswith(f'{API_BASE_URL}{BLOB_PATH_PREFIX}'):
+        return value[len(API_BASE_URL):]
+    return value
+
+
+def blob_digest_from_url(value: str) -> Optional[str]:
+    value = _strip_api_base_url(value)
+    if not value.startswith(BLOB_PATH_PREFIX):
+        return None
+    digest = value[len(BLOB_PATH_PREFIX):]
+    return digest if DIGEST_PATTERN.match(digest) else None
+
+
+async def blob_info_for_url(value: str) -> Optional[BlobInfo]:
+    digest = blob_digest_from_url(value)
+    if digest is None:
+        return None
+    return await blob_backend.info(digest)
+
+
+def require_content_type(content_type: str, allowed_types: FrozenSet[str]) -> None:
+    if content_type not in allowed_types:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'Unsupported file type {content_type!r}')
+
+
+def check_data_url(value: str, allowed_types: FrozenSet[str]) -> None:
+    parsed = parse_data_url(value)
+    if parsed is not None:
+        require_content_type(parsed[0], allowed_types)
+
+
+async def externalize_data_url(value: str, allowed_types: FrozenSet[str] = IMAGE_CONTENT_TYPES) -> str:
+    value = _strip_api_base_url(value)
+    parsed = parse_data_url(value)
+    if parsed is None:
+        return value
+    content_type, data = parsed
+    require_content_type(content_type, allowed_types)
+    return blob_path(await store_blob(data, content_type))
+
+
+def resolve_blob_url(value: str) -> str:
+    if value.startswith(BLOB_PATH_PREFIX):
+        return f'{API_BASE_URL}{value}'
+    return value
+
+
+async def blob_data_url(value: str) -> str:
+    info = await blob_info_for_url(value)
+    if info is None:
+        return value
+    data = b''.join([chunk async for chunk in blob_backend.iter_chunks(info.digest)])
+    return f'data:{info.content_type};base64,{base64.b64encode(data).decode("ascii")}'
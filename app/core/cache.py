@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class ByteLRUCache:
+    def __init__(
+        self,
+        max_bytes: int,
+        max_generations: int = 10000,
+        on_remove: Optional[Callable[[Hashable], None]] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_generations = max_generations
+        # Called outside the lock with each key whose value was evicted, invalidated or cleared.
+        self.on_remove = on_remove
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        # Per-key generations come from one counter. Forgetting a key raises the floor that untracked keys
+        # report, so a value built before the key was forgotten can never be stored afterwards.
+        self._generations: 'OrderedDict[Hashable, int]' = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        # Neither counted nor refreshed in LRU order.
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def generation(self, key: Hashable) -> int:
+        with self._lock:
+            return self._generations.get(key, self._floor)
+
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None, generation: Optional[int] = None) -> bool:
+        if size is None:
+            size = len(value)
+        with self._lock:
+            # A write that landed while the value was being built makes it stale.
+            if generation is not None and generation != self._generations.get(key, self._floor):
+                return False
+            if size > self.max_bytes:
+                return False
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            removed = self._evict()
+        self._notify(removed)
+        return True
+
+    def resize(self, key: Hashable, value: Any, size: int) -> bool:
+        # Re-accounts a cached value that grew in place; a replaced or evicted value is left alone.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not value:
+                return False
+            self._entries[key] = (value, size)
+            self._size += size - entry[1]
+            removed = self._evict()
+        self._notify(removed)
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._bump(key)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+        if previous is not None:
+            self._notify([key])
+
+    def clear(self) -> None:
+        with self._lock:
+            removed = list(self._entries)
+            for key in removed:
+                self._bump(key)
+            self._entries.clear()
+            self._size = 0
+        self._notify(removed)
+
+    def _bump(self, key: Hashable) -> None:
+        self._counter += 1
+        self._generations[key] = self._counter
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.max_generations:
+            self._generations.popitem(last=False)
+            self._floor = self._counter = self._counter + 1
+
+    def _evict(self) -> List[Hashable]:
+        removed = []
+        while self._size > self.max_bytes and self._entries:
+            key, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+            removed.append(key)
+            if self._generations.pop(key, None) is not None:
+                self._floor = self._counter = self._counter + 1
+        return removed
+
+    def _notify(self, keys: List[Hashable]) -> None:
+        if self.on_remove is not None:
+            for key in keys:
+                self.on_remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class TTLCache:
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, key: Hashable) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def set(
+        self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None, generation: Optional[int] = None
+    ) -> bool:
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0 or self.max_entries <= 0:
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key, 0):
+                return False
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in self._entries:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,160 @@
+import asyncio
+import gzip
+import zlib
+from typing import Callable, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_ROUTE_MIN_BYTES,
+    COMPRESSION_THREAD_MIN_BYTES,
+    PRECOMPRESS_BROTLI_QUALITY,
+    PRECOMPRESS_GZIP_LEVEL,
+)
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it only gzip is negotiated.
+    brotli = None
+
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml')
+# A compressor buffers its output, which would hold server-sent events back indefinitely.
+STREAMING_TYPES = ('text/event-stream',)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    weights: Dict[str, float] = {}
+    for entry in accept_encoding.split(','):
+        coding, _, params = entry.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+
+    # Highest q-value wins; ties go to the server's preference order.
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compression_min_bytes(scope: Scope) -> int:
+    route = scope.get('route')
+    return COMPRESSION_ROUTE_MIN_BYTES.get(getattr(route, 'path_format', ''), COMPRESSION_MIN_BYTES)
+
+
+def response_encoding(scope: Scope, size: Optional[int]) -> Optional[str]:
+    # A streamed body has no size up front and is always worth compressing.
+    minimum = compression_min_bytes(scope)
+    if minimum < 0 or (size is not None and size < minimum):
+        return None
+    return negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY if level is None else level)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL if level is None else level, mtime=0)
+
+
+def precompress(body: bytes, encoding: str) -> bytes:
+    return compress(body, encoding, PRECOMPRESS_BROTLI_QUALITY if encoding == 'br' else PRECOMPRESS_GZIP_LEVEL)
+
+
+class StreamCompressor:
+    def __init__(self, encoding: str) -> None:
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            # wbits 16 + 15 writes a gzip container around the deflate stream.
+            compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self.finish = compressor.compress, compressor.flush
+
+
+async def _off_loop(func: Callable[[bytes], bytes], body: bytes) -> bytes:
+    if len(body) >= COMPRESSION_THREAD_MIN_BYTES:
+        return await asyncio.to_thread(func, body)
+    return func(body)
+
+
+def _is_compressible(headers: MutableHeaders, status_code: int) -> bool:
+    if status_code in (204, 206, 304) or 'content-encoding' in headers or 'content-range' in headers:
+        return False
+    content_type = headers.get('content-type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(STREAMING_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                # Held back until the first body chunk shows whether the response is worth compressing.
+                start_message = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is not None:
+                body = await _off_loop(compressor.compress, body) + (b'' if more_body else compressor.finish())
+                await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+                return
+
+            headers = MutableHeaders(raw=start_message['headers'])
+            encoding = None
+            if _is_compressible(headers, start_message['status']):
+                if 'accept-encoding' not in headers.get('vary', '').lower():
+                    headers.add_vary_header('Accept-Encoding')
+                encoding = response_encoding(scope, None if more_body else len(body))
+            if encoding is None:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers['Content-Encoding'] = encoding
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                # The coded body is not byte-identical to what the upstream tag names.
+                headers['ETag'] = f'W/{etag}'
+            if more_body:
+                del headers['Content-Length']
+                compressor = StreamCompressor(encoding)
+                body = await _off_loop(compressor.compress, body)
+            else:
+                body = await _off_loop(lambda data: compress(data, encoding), body)
+                headers['Content-Length'] = str(len(body))
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -19,3 +19,80 @@ def _parse_csv_urls(value: str) -> list[str]:
 
 _default_cors = f'{FRONTEND_BASE_URL},http://localhost:5173,http://127.0.0.1:5173'
 CORS_ALLOW_ORIGINS = _parse_csv_urls(os.getenv('CORS_ALLOW_ORIGINS', _default_cors))
+
+PUBLIC_MENU_CACHE_MAX_BYTES = int(os.getenv('PUBLIC_MENU_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+CACHE_CONTROL_POLICIES = {
+    'public_menu': os.getenv('CACHE_CONTROL_PUBLIC_MENU', 'public, max-age=60, must-revalidate').strip(),
+    'menu_items': os.getenv('CACHE_CONTROL_MENU_ITEMS', 'private, no-cache').strip(),
+    'menu_categories': os.getenv('CACHE_CONTROL_MENU_CATEGORIES', 'private, no-cache').strip(),
+    'restaurant_templates': os.getenv('CACHE_CONTROL_RESTAURANT_TEMPLATES', 'private, no-cache').strip(),
+    'restaurant_qr': os.getenv('CACHE_CONTROL_RESTAURANT_QR', 'private, max-age=31536000').strip(),
+    'template_asset': os.getenv('CACHE_CONTROL_TEMPLATE_ASSET', 'private, no-cache').strip(),
+    'public_template_asset': os.getenv('CACHE_CONTROL_PUBLIC_TEMPLATE_ASSET', 'public, max-age=60, must-revalidate').strip(),
+}
+
+API_BASE_URL = os.getenv('API_BASE_URL', '').strip().rstrip('/')
+BLOB_BACKEND = os.getenv('BLOB_BACKEND', 'gridfs').strip().lower()
+BLOB_STORAGE_DIR = Path(os.getenv('BLOB_STORAGE_DIR', str(Path(__file__).resolve().parents[2] / 'storage' / 'blobs')))
+
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))
+IMAGE_VARIANT_QUEUE_SIZE = int(os.getenv('IMAGE_VARIANT_QUEUE_SIZE', '16'))
+PUBLIC_MENU_IMAGE_WIDTH = int(os.getenv('PUBLIC_MENU_IMAGE_WIDTH', '480'))
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv('PRINCIPAL_CACHE_TTL_SECONDS', '30'))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv('PRINCIPAL_CACHE_MAX_ENTRIES', '10000'))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv('TOKEN_CACHE_TTL_SECONDS', '300'))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', '50000'))
+
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '120000'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv('PASSWORD_HASH_MAX_CONCURRENCY', '8'))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS', '2'))
+
+QR_CACHE_MAX_BYTES = int(os.getenv('QR_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+SEARCH_INDEX_CACHE_MAX_BYTES = int(os.getenv('SEARCH_INDEX_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '500'))
+
+DEFAULT_PAGE_LIMIT = int(os.getenv('DEFAULT_PAGE_LIMIT', '50'))
+MAX_PAGE_LIMIT = int(os.getenv('MAX_PAGE_LIMIT', '500'))
+
+# Versions of per-restaurant change history kept for delta sync; older clients reload the full menu.
+MENU_CHANGE_LOG_SIZE = int(os.getenv('MENU_CHANGE_LOG_SIZE', '100'))
+MENU_CHANGE_MAX_ENTRIES = int(os.getenv('MENU_CHANGE_MAX_ENTRIES', '50'))
+
+MENU_EVENTS_QUEUE_SIZE = int(os.getenv('MENU_EVENTS_QUEUE_SIZE', '16'))
+MENU_EVENTS_HEARTBEAT_SECONDS = float(os.getenv('MENU_EVENTS_HEARTBEAT_SECONDS', '15'))
+# Streams end after this long and clients reconnect, so restarts and load balancing are not held up by them.
+MENU_EVENTS_MAX_STREAM_SECONDS = float(os.getenv('MENU_EVENTS_MAX_STREAM_SECONDS', '300'))
+# Only used when MongoDB has no change streams (standalone servers): writes made by other workers are polled for.
+MENU_EVENTS_POLL_SECONDS = float(os.getenv('MENU_EVENTS_POLL_SECONDS', '2'))
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_LINE_BYTES = int(os.getenv('IMPORT_MAX_LINE_BYTES', str(8 * 1024 * 1024)))
+
+MIGRATE_ON_STARTUP = os.getenv('MIGRATE_ON_STARTUP', 'false').strip().lower() in {'1', 'true', 'yes'}
+# A runner refreshes its claim on the migration it applies; a claim left alone this long was abandoned.
+MIGRATION_LOCK_TIMEOUT_SECONDS = float(os.getenv('MIGRATION_LOCK_TIMEOUT_SECONDS', '300'))
+
+# Static publishing is off unless an output directory is configured.
+PUBLISH_DIR = os.getenv('PUBLISH_DIR', '').strip()
+PUBLISH_HTML = os.getenv('PUBLISH_HTML', 'false').strip().lower() in {'1', 'true', 'yes'}
+PUBLISH_DEBOUNCE_SECONDS = float(os.getenv('PUBLISH_DEBOUNCE_SECONDS', '2'))
+PUBLISH_KEEP_VERSIONS = int(os.getenv('PUBLISH_KEEP_VERSIONS', '3'))
+PUBLISH_CONCURRENCY = int(os.getenv('PUBLISH_CONCURRENCY', '8'))
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+# Bodies (or streamed chunks) at least this large are compressed in a worker thread, off the event loop.
+COMPRESSION_THREAD_MIN_BYTES = int(os.getenv('COMPRESSION_THREAD_MIN_BYTES', '65536'))
+# Cached payloads are compressed once per menu version, so they can afford the slower settings.
+PRECOMPRESS_GZIP_LEVEL = int(os.getenv('PRECOMPRESS_GZIP_LEVEL', '9'))
+PRECOMPRESS_BROTLI_QUALITY = int(os.getenv('PRECOMPRESS_BROTLI_QUALITY', '9'))
+# Minimum body size per route template; a negative value disables compression for that route.
+COMPRESSION_ROUTE_MIN_BYTES = {
+    '/public/menu/{restaurant_id}': int(os.getenv('COMPRESSION_MIN_BYTES_PUBLIC_MENU', '512')),
+    '/restaurant/export': int(os.getenv('COMPRESSION_MIN_BYTES_RESTAURANT_EXPORT', '0')),
+}
@@ -1,27 +1,70 @@
-from pymongo import ASCENDING, MongoClient
+from typing import Any, Optional
+
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
 
 from app.core.config import MONGO_URI
+from app.core.telemetry import MongoCommandMetrics, MongoPoolMetrics
+
+DEFAULT_DB_NAME = 'MenuApp'
+
+_client: Optional[AsyncMongoClient] = None
+_database: Optional[AsyncDatabase] = None
+_sync_client: Optional[MongoClient] = None
+
+
+def get_client() -> AsyncMongoClient:
+    # Created on first use so importing the app, a script or a worker never touches Mongo.
+    global _client, _database
+    if _client is None:
+        _client = AsyncMongoClient(MONGO_URI, event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()])
+        _database = _client.get_default_database(default=DEFAULT_DB_NAME)
+    return _client
+
+
+def get_database() -> AsyncDatabase:
+    get_client()
+    return _database
+
+
+async def close_client() -> None:
+    global _client, _database, _sync_client
+    if _client is not None:
+        client, _client, _database = _client, None, None
+        await client.close()
+    if _sync_client is not None:
+        sync_client, _sync_client = _sync_client, None
+        sync_client.close()
 
-client = MongoClient(MONGO_URI)
-default_db = client.get_default_database()
-db = default_db if default_db is not None else client['MenuApp']
 
-users_col = db['users']
-items_col = db['menu_items']
-categories_col = db['menu_categories']
-templates_col = db['menu_templates']
+class LazyCollection:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._database: Optional[AsyncDatabase] = None
+        self._collection: Optional[AsyncCollection] = None
 
+    def resolve(self) -> AsyncCollection:
+        database = get_database()
+        if self._database is not database:
+            self._database, self._collection = database, database[self.name]
+        return self._collection
 
-def init_indexes() -> None:
-    users_col.create_index([('email', ASCENDING)], unique=True)
-    items_col.create_index([('restaurant_id', ASCENDING), ('category', ASCENDING)])
-    categories_col.create_index([('restaurant_id', ASCENDING), ('name_key', ASCENDING)], unique=True)
-    templates_col.create_index([('restaurant_id', ASCENDING), ('name_key', ASCENDING)], unique=True)
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.resolve(), attr)
 
 
-def cleanup_legacy_template_columns() -> None:
-    templates_col.update_many({'base_template_id': {'$exists': True}}, {'$unset': {'base_template_id': ''}})
+users_col = LazyCollection('users')
+items_col = LazyCollection('menu_items')
+categories_col = LazyCollection('menu_categories')
+templates_col = LazyCollection('menu_templates')
+published_menus_col = LazyCollection('published_menus')
 
 
-init_indexes()
-cleanup_legacy_template_columns()
+def get_sync_db() -> Database:
+    # Blocking client for ad-hoc scripts and shells that cannot run an event loop; one per process.
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = MongoClient(MONGO_URI)
+    return _sync_client.get_default_database(default=DEFAULT_DB_NAME)
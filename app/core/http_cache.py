@@ -0,0 +1,65 @@
+import hashlib
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+
+from app.core.config import CACHE_CONTROL_POLICIES
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def coded_etag(etag: str, encoding: Optional[str]) -> str:
+    # Each content coding is its own representation, so it gets its own tag.
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so proxies that weaken the tag still revalidate.
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip().removeprefix('W/')
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, policy: str) -> dict:
+    headers = {'ETag': etag}
+    cache_control = CACHE_CONTROL_POLICIES.get(policy, '')
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+    return headers
+
+
+def not_modified_response(if_none_match: str, etag: str, policy: str) -> Optional[Response]:
+    if not etag_matches(if_none_match, etag):
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, policy))
+
+
+def parse_byte_range(range_header: str, length: int) -> Optional[Tuple[int, int]]:
+    # A single byte range is honoured; anything else is ignored and the full body served, as RFC 9110 allows.
+    unit, _, spec = range_header.partition('=')
+    first, dash, last = spec.strip().partition('-')
+    if unit.strip().lower() != 'bytes' or not dash or not (first or last):
+        return None
+    if not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if first and last and int(last) < int(first):
+        return None
+
+    if first:
+        start, end = int(first), min(int(last), length - 1) if last else length - 1
+    else:
+        start, end = max(length - int(last), 0), length - 1 if int(last) else -1
+    if start >= length or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail='Requested range not satisfiable',
+            headers={'Content-Range': f'bytes */{length}'},
+        )
+    return start, end
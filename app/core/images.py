@@ -0,0 +1,52 @@
+import io
+from typing import List, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import IMAGE_VARIANT_WORKERS
+from app.core.process_pool import ProcessPool
+
+VARIANT_WIDTHS = (160, 480, 1080)
+VARIANT_FORMATS = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+RESIZABLE_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/jpg', 'image/webp', 'image/bmp', 'image/tiff'}
+
+_pool = ProcessPool(IMAGE_VARIANT_WORKERS)
+
+
+def render_variants(data: bytes) -> List[Tuple[int, int, str, bytes]]:
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    opaque = image
+    if has_alpha:
+        # JPEG has no alpha channel, so transparent areas are flattened onto white.
+        opaque = Image.new('RGB', image.size, (255, 255, 255))
+        opaque.paste(image, mask=image.getchannel('A'))
+
+    variants = []
+    for width in VARIANT_WIDTHS:
+        if width >= image.width:
+            break
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        resized_opaque = opaque.resize((width, height), Image.Resampling.LANCZOS) if has_alpha else resized
+
+        webp = io.BytesIO()
+        resized.save(webp, format='WEBP', quality=80, method=4)
+        variants.append((width, height, 'webp', webp.getvalue()))
+
+        jpeg = io.BytesIO()
+        resized_opaque.save(jpeg, format='JPEG', quality=82, optimize=True, progressive=True)
+        variants.append((width, height, 'jpeg', jpeg.getvalue()))
+    return variants
+
+
+async def render_variants_in_pool(data: bytes) -> List[Tuple[int, int, str, bytes]]:
+    return await _pool.run(render_variants, data)
+
+
+def shutdown_image_workers() -> None:
+    _pool.shutdown()
@@ -1,15 +1,54 @@
+import asyncio
 import base64
 import io
 
 import qrcode
+import qrcode.image.svg
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
 
+from app.core.cache import ByteLRUCache
+from app.core.config import QR_CACHE_MAX_BYTES
 
-def generate_qr_data_url(url: str) -> str:
-    qr = qrcode.QRCode(version=1, box_size=8, border=2)
+ERROR_CORRECTION_LEVELS = {
+    'L': ERROR_CORRECT_L,
+    'M': ERROR_CORRECT_M,
+    'Q': ERROR_CORRECT_Q,
+    'H': ERROR_CORRECT_H,
+}
+QR_MEDIA_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+qr_cache = ByteLRUCache(QR_CACHE_MAX_BYTES)
+
+
+def render_qr(url: str, box_size: int = 8, error_correction: str = 'M', image_format: str = 'png') -> bytes:
+    qr = qrcode.QRCode(
+        version=1,
+        box_size=box_size,
+        border=2,
+        error_correction=ERROR_CORRECTION_LEVELS[error_correction],
+        image_factory=qrcode.image.svg.SvgPathImage if image_format == 'svg' else None,
+    )
     qr.add_data(url)
     qr.make(fit=True)
-    img = qr.make_image(fill_color='black', back_color='white')
     buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    data = base64.b64encode(buf.getvalue()).decode('utf-8')
-    return f'data:image/png;base64,{data}'
+    if image_format == 'svg':
+        qr.make_image().save(buf)
+    else:
+        qr.make_image(fill_color='black', back_color='white').save(buf, format='PNG')
+    return buf.getvalue()
+
+
+async def get_qr(url: str, box_size: int = 8, error_correction: str = 'M', image_format: str = 'png') -> bytes:
+    key = (url, box_size, error_correction, image_format)
+    cached = qr_cache.get(key)
+    if cached is not None:
+        return cached
+    data = await asyncio.to_thread(render_qr, url, box_size, error_correction, image_format)
+    qr_cache.set(key, data)
+    return data
+
+
+def qr_data_url(data: bytes, image_format: str = 'png') -> str:
+    encoded = base64.b64encode(data).decode('utf-8')
+    return f'data:{QR_MEDIA_TYPES[image_format]};base64,{encoded}'
+
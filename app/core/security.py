@@ -3,32 +3,60 @@ import hashlib
 import hmac
 import secrets
 from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 
 from jose import jwt
 
-from app.core.config import JWT_ALGORITHM, JWT_EXP_DAYS, JWT_SECRET
+from app.core.config import JWT_ALGORITHM, JWT_EXP_DAYS, JWT_SECRET, PASSWORD_HASH_ITERATIONS
 
+HASH_SCHEME = 'pbkdf2_sha256'
+LEGACY_HASH_ITERATIONS = 120_000
 
-def hash_password(password: str, salt: bytes) -> str:
-    hashed = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 120_000)
+
+def hash_password(password: str, salt: bytes, iterations: int = PASSWORD_HASH_ITERATIONS) -> str:
+    hashed = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
     return base64.b64encode(hashed).decode('utf-8')
 
 
-def build_password_hash(password: str) -> str:
+def build_password_hash(password: str, iterations: int = PASSWORD_HASH_ITERATIONS) -> str:
     salt = secrets.token_bytes(16)
-    return f"{base64.b64encode(salt).decode('utf-8')}:{hash_password(password, salt)}"
+    salt_b64 = base64.b64encode(salt).decode('utf-8')
+    return f'{HASH_SCHEME}${iterations}${salt_b64}${hash_password(password, salt, iterations)}'
+
+
+def _parse_password_hash(stored_hash: str) -> Optional[Tuple[int, str, str]]:
+    if stored_hash.startswith(f'{HASH_SCHEME}$'):
+        parts = stored_hash.split('$')
+        if len(parts) != 4 or not parts[1].isdigit():
+            return None
+        return int(parts[1]), parts[2], parts[3]
+
+    # Hashes written before parameters were stored: "<salt>:<hash>" at the original iteration count.
+    if ':' in stored_hash:
+        salt_b64, hash_b64 = stored_hash.split(':', 1)
+        return LEGACY_HASH_ITERATIONS, salt_b64, hash_b64
+    return None
 
 
 def verify_password(password: str, stored_hash: str) -> bool:
     try:
-        salt_b64, hash_b64 = stored_hash.split(':', 1)
-        salt = base64.b64decode(salt_b64)
-        computed = hash_password(password, salt)
+        parsed = _parse_password_hash(stored_hash)
+        if parsed is None:
+            return False
+        iterations, salt_b64, hash_b64 = parsed
+        computed = hash_password(password, base64.b64decode(salt_b64), iterations)
         return hmac.compare_digest(computed, hash_b64)
     except Exception:
         return False
 
 
+def password_needs_rehash(stored_hash: str) -> bool:
+    if not stored_hash.startswith(f'{HASH_SCHEME}$'):
+        return True
+    parsed = _parse_password_hash(stored_hash)
+    return parsed is None or parsed[0] != PASSWORD_HASH_ITERATIONS
+
+
 def create_token(user_id: str) -> str:
     exp = datetime.now(timezone.utc) + timedelta(days=JWT_EXP_DAYS)
     payload = {'sub': user_id, 'exp': exp}
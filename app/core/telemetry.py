@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import Counter, Gauge, Histogram
+
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+MONGO_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+KNOWN_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+UNMATCHED_ROUTE = '<unmatched>'
+
+http_requests_total = Counter(
+    'http_requests_total', 'HTTP requests by route template and status.', ('method', 'route', 'status')
+)
+http_request_duration_seconds = Histogram(
+    'http_request_duration_seconds', 'Time until the last response byte was sent.', ('method', 'route')
+)
+http_response_size_bytes = Histogram(
+    'http_response_size_bytes', 'Response body size.', ('method', 'route'), buckets=RESPONSE_SIZE_BUCKETS
+)
+http_requests_in_flight = Gauge('http_requests_in_flight', 'HTTP requests currently being served.', ('method',))
+
+mongo_command_duration_seconds = Histogram(
+    'mongo_command_duration_seconds',
+    'MongoDB command round trips by collection and command.',
+    ('collection', 'command', 'outcome'),
+    buckets=MONGO_LATENCY_BUCKETS,
+)
+mongo_pool_connections = Gauge('mongo_pool_connections', 'Open connections per server.', ('address',))
+mongo_pool_checked_out = Gauge('mongo_pool_checked_out', 'Connections checked out per server.', ('address',))
+mongo_pool_checkout_duration_seconds = Histogram(
+    'mongo_pool_checkout_duration_seconds',
+    'Time spent waiting for a pooled connection.',
+    ('address',),
+    buckets=MONGO_LATENCY_BUCKETS,
+)
+mongo_pool_checkout_failures_total = Counter(
+    'mongo_pool_checkout_failures_total', 'Failed connection checkouts by reason.', ('address', 'reason')
+)
+mongo_pool_cleared_total = Counter('mongo_pool_cleared_total', 'Pool clears after server errors.', ('address',))
+
+
+def _route_label(scope: Scope) -> str:
+    # The template, never the raw path: restaurant ids and digests would make labels unbounded.
+    route = scope.get('route')
+    return getattr(route, 'path_format', None) or getattr(route, 'path', None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method'] if scope['method'] in KNOWN_METHODS else 'OTHER'
+        in_flight = http_requests_in_flight.labels(method)
+        status_code = 500
+        body_size = 0
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, body_size
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            elif message['type'] == 'http.response.body':
+                body_size += len(message.get('body', b''))
+            await send(message)
+
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            route = _route_label(scope)
+            http_requests_total.labels(method, route, status_code).inc()
+            http_request_duration_seconds.labels(method, route).observe(time.perf_counter() - started)
+            http_response_size_bytes.labels(method, route).observe(body_size)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self) -> None:
+        self._collections: Dict[Tuple[Any, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        # Only the started event carries the command document, so remember its collection.
+        target = event.command.get('collection' if event.command_name == 'getMore' else event.command_name)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ''
+
+    def _finish(self, event: Any, outcome: str) -> None:
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), '')
+        mongo_command_duration_seconds.labels(collection, event.command_name, outcome).observe(
+            event.duration_micros / 1_000_000
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, 'success')
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, 'failure')
+
+
+def _address_label(address: Tuple[str, int]) -> str:
+    return f'{address[0]}:{address[1]}'
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        mongo_pool_cleared_total.labels(_address_label(event.address)).inc()
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        mongo_pool_connections.labels(_address_label(event.address)).inc()
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        mongo_pool_connections.labels(_address_label(event.address)).dec()
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        address = _address_label(event.address)
+        mongo_pool_checkout_failures_total.labels(address, event.reason).inc()
+        mongo_pool_checkout_duration_seconds.labels(address).observe(event.duration)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        address = _address_label(event.address)
+        mongo_pool_checked_out.labels(address).inc()
+        mongo_pool_checkout_duration_seconds.labels(address).observe(event.duration)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        mongo_pool_checked_out.labels(_address_label(event.address)).dec()
@@ -1,29 +1,66 @@
+import time
 from typing import Any, Dict
 
 from bson import ObjectId
 from fastapi import Header, HTTPException, status
 from jose import jwt
 
-from app.core.config import JWT_ALGORITHM, JWT_SECRET
+from app.core.cache import TTLCache
+from app.core.config import (
+    JWT_ALGORITHM,
+    JWT_SECRET,
+    PRINCIPAL_CACHE_MAX_ENTRIES,
+    PRINCIPAL_CACHE_TTL_SECONDS,
+    TOKEN_CACHE_MAX_ENTRIES,
+    TOKEN_CACHE_TTL_SECONDS,
+)
 from app.core.database import users_col
+from app.services.projections import USER_PRINCIPAL_PROJECTION
 
+principal_cache = TTLCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS)
+token_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
 
-def get_current_user(authorization: str = Header(default='')) -> Dict[str, Any]:
-    if not authorization.startswith('Bearer '):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Missing bearer token')
 
-    token = authorization.replace('Bearer ', '', 1).strip()
+def invalidate_principal(user_id: ObjectId) -> None:
+    principal_cache.invalidate(user_id)
+
+
+def _verified_user_id(token: str) -> ObjectId:
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get('sub')
-        if not user_id or not ObjectId.is_valid(user_id):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token payload')
-
-        user = users_col.find_one({'_id': ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
-        return user
-    except HTTPException:
-        raise
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid or expired token') from exc
+
+    user_id = payload.get('sub')
+    if not user_id or not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token payload')
+
+    object_id = ObjectId(user_id)
+    # Never trust a cached verification past the token's own expiry.
+    expires_in = float(payload['exp']) - time.time() if 'exp' in payload else None
+    token_cache.set(token, object_id, ttl_seconds=expires_in)
+    return object_id
+
+
+async def get_current_user(authorization: str = Header(default='')) -> Dict[str, Any]:
+    if not authorization.startswith('Bearer '):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Missing bearer token')
+
+    token = authorization.replace('Bearer ', '', 1).strip()
+    user_id = _verified_user_id(token)
+
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return dict(principal)
+
+    generation = principal_cache.generation(user_id)
+    user = await users_col.find_one({'_id': user_id}, USER_PRINCIPAL_PROJECTION)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
+
+    principal_cache.set(user_id, user, generation=generation)
+    return dict(user)
@@ -1,12 +1,51 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.core.config import CORS_ALLOW_ORIGINS
-from app.routers import auth, categories, health, items, public, restaurant, templates
+from app.core.compression import CompressionMiddleware
+from app.core.config import CORS_ALLOW_ORIGINS, MIGRATE_ON_STARTUP, PUBLISH_DIR
+from app.core.database import close_client
+from app.core.images import shutdown_image_workers
+from app.core.telemetry import MetricsMiddleware
+from app.migrations import MigrationLocked, run_migrations
+from app.routers import auth, blobs, categories, health, items, public, restaurant, templates
+from app.services.events import menu_events
+from app.services.menu import flush_menu_rebuilds, menu_change_listeners
+from app.services.passwords import shutdown_password_workers
+from app.services.publishing import flush_pending_publishes, schedule_publish
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes ship through `python -m app.scripts.migrate`; workers only opt in for local runs.
+    if MIGRATE_ON_STARTUP:
+        try:
+            await run_migrations()
+        except MigrationLocked as exc:
+            # Workers started together race for the first claim; the winner applies the rest.
+            logger.warning('%s', exc)
+    if PUBLISH_DIR:
+        menu_change_listeners.append(schedule_publish)
+    yield
+    await flush_menu_rebuilds()
+    if PUBLISH_DIR:
+        menu_change_listeners.remove(schedule_publish)
+        await flush_pending_publishes()
+    await menu_events.close()
+    shutdown_image_workers()
+    shutdown_password_workers()
+    await close_client()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title='Restaurant Menu API', version='1.0.0')
+    app = FastAPI(
+        title='Restaurant Menu API', version='1.0.0', lifespan=lifespan, default_response_class=ORJSONResponse
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=CORS_ALLOW_ORIGINS,
@@ -14,6 +53,8 @@ def create_app() -> FastAPI:
         allow_methods=['*'],
         allow_headers=['*'],
     )
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
     app.include_router(health.router)
     app.include_router(auth.router)
@@ -22,9 +63,10 @@ def create_app() -> FastAPI:
     app.include_router(items.router)
     app.include_router(restaurant.router)
     app.include_router(public.router)
+    app.include_router(blobs.router)
 
     @app.get('/')
-    def root():
+    async def root():
         return {'message': 'Restaurant Menu API is running', 'health': '/health', 'docs': '/docs'}
 
     return app
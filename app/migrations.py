@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.core.config import MIGRATION_LOCK_TIMEOUT_SECONDS
+from app.core.database import LazyCollection, categories_col, items_col, templates_col, users_col
+from app.scripts.backfill_category_ids import backfill_category_ids
+from app.scripts.migrate_inline_blobs import migrate_inline_blobs
+
+logger = logging.getLogger(__name__)
+
+migrations_col = LazyCollection('schema_migrations')
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    apply: Callable[[], Awaitable[Any]]
+
+
+class MigrationLocked(RuntimeError):
+    def __init__(self, migration: Migration, record: Dict[str, Any]) -> None:
+        super().__init__(
+            f'Migration {migration.version}_{migration.name} is being applied by another runner '
+            f'(claimed at {record.get("started_at")}); later migrations wait for it'
+        )
+        self.migration = migration
+        self.record = record
+
+
+async def create_indexes() -> None:
+    await users_col.create_index([('email', ASCENDING)], unique=True)
+    await categories_col.create_index([('restaurant_id', ASCENDING), ('name_key', ASCENDING)], unique=True)
+    await templates_col.create_index([('restaurant_id', ASCENDING), ('name_key', ASCENDING)], unique=True)
+    # Keyset pages are range scans over these; items are scanned one category at a time,
+    # which also serves the per-category cascades.
+    await items_col.create_index(
+        [('restaurant_id', ASCENDING), ('category_id', ASCENDING), ('name', ASCENDING), ('_id', ASCENDING)]
+    )
+    await categories_col.create_index([('restaurant_id', ASCENDING), ('name', ASCENDING), ('_id', ASCENDING)])
+    await templates_col.create_index([('restaurant_id', ASCENDING), ('name', ASCENDING), ('_id', ASCENDING)])
+
+
+async def drop_name_keyed_item_indexes() -> None:
+    for index_name in ('restaurant_id_1_category_1', 'restaurant_id_1_category_1_name_1__id_1'):
+        try:
+            await items_col.drop_index(index_name)
+        except OperationFailure:
+            pass
+
+
+async def cleanup_legacy_template_columns() -> None:
+    await templates_col.update_many({'base_template_id': {'$exists': True}}, {'$unset': {'base_template_id': ''}})
+
+
+# Append only: a released version must never be renumbered or edited.
+MIGRATIONS: List[Migration] = [
+    Migration('0001', 'create_indexes', create_indexes),
+    Migration('0002', 'cleanup_legacy_template_columns', cleanup_legacy_template_columns),
+    Migration('0003', 'externalize_inline_blobs', migrate_inline_blobs),
+    Migration('0004', 'backfill_item_category_ids', backfill_category_ids),
+    Migration('0005', 'drop_name_keyed_item_indexes', drop_name_keyed_item_indexes),
+]
+
+
+async def migration_records() -> Dict[str, Dict[str, Any]]:
+    return {doc['_id']: doc async for doc in migrations_col.find({})}
+
+
+def is_stale_claim(record: Dict[str, Any]) -> bool:
+    # Stored datetimes come back naive (UTC) unless the client is tz-aware.
+    heartbeat = record.get('heartbeat_at') or record['started_at']
+    if heartbeat.tzinfo is None:
+        heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - heartbeat > timedelta(seconds=MIGRATION_LOCK_TIMEOUT_SECONDS)
+
+
+async def pending_migrations() -> List[Migration]:
+    # A claimed but unfinished migration is still pending.
+    records = await migration_records()
+    return [migration for migration in MIGRATIONS if records.get(migration.version, {}).get('state') != 'applied']
+
+
+async def _claim(migration: Migration, record: Dict[str, Any], runner: str, force_unlock: bool) -> None:
+    now = datetime.now(timezone.utc)
+    claim = {'name': migration.name, 'state': 'running', 'runner': runner, 'started_at': now, 'heartbeat_at': now}
+    # The claim doubles as a lock, so concurrent runners never apply the same version twice.
+    if not record:
+        try:
+            await migrations_col.insert_one({'_id': migration.version, **claim})
+            return
+        except DuplicateKeyError as exc:
+            record = await migrations_col.find_one({'_id': migration.version}) or {}
+            raise MigrationLocked(migration, record) from exc
+    if not (force_unlock or is_stale_claim(record)):
+        raise MigrationLocked(migration, record)
+    # Taking over an abandoned claim only succeeds for one runner: the one that still sees the old owner.
+    taken = await migrations_col.find_one_and_update(
+        {'_id': migration.version, 'state': 'running', 'runner': record.get('runner')}, {'$set': claim}
+    )
+    if taken is None:
+        raise MigrationLocked(migration, record)
+    logger.warning('Took over the abandoned claim on migration %s (started at %s)', migration.version, record['started_at'])
+
+
+async def _refresh_claim(version: str, runner: str) -> None:
+    while True:
+        await asyncio.sleep(MIGRATION_LOCK_TIMEOUT_SECONDS / 5)
+        await migrations_col.update_one(
+            {'_id': version, 'state': 'running', 'runner': runner}, {'$set': {'heartbeat_at': datetime.now(timezone.utc)}}
+        )
+
+
+async def run_migrations(force_unlock: bool = False) -> List[Migration]:
+    # Strictly in order: a migration held by another runner stops the run, so later ones never overtake it.
+    runner = uuid.uuid4().hex
+    records = await migration_records()
+    applied: List[Migration] = []
+    for migration in MIGRATIONS:
+        record = records.get(migration.version, {})
+        if record.get('state') == 'applied':
+            continue
+        await _claim(migration, record, runner, force_unlock)
+
+        started = time.perf_counter()
+        refresher = asyncio.create_task(_refresh_claim(migration.version, runner))
+        try:
+            result = await migration.apply()
+        except BaseException:
+            await migrations_col.delete_one({'_id': migration.version, 'state': 'running', 'runner': runner})
+            raise
+        finally:
+            refresher.cancel()
+        await migrations_col.update_one(
+            {'_id': migration.version, 'runner': runner},
+            {
+                '$set': {
+                    'state': 'applied',
+                    'applied_at': datetime.now(timezone.utc),
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                    'result': repr(result) if result is not None else None,
+                }
+            },
+        )
+        logger.info('Applied migration %s_%s', migration.version, migration.name)
+        applied.append(migration)
+    return applied
@@ -1,42 +1,61 @@
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from pymongo.errors import DuplicateKeyError
 
 from app.core.database import users_col
-from app.core.security import build_password_hash, create_token, verify_password
+from app.core.security import create_token, password_needs_rehash
 from app.dependencies.auth import get_current_user
 from app.schemas.auth import AuthResponse, LoginRequest, RegisterRequest, RegisterResponse
+from app.services.passwords import auth_latency, hash_password_async, verify_password_async
+from app.services.projections import USER_LOGIN_PROJECTION
 from app.services.serializers import parse_user
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
 
-@router.post('/register', response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterRequest) -> RegisterResponse:
-    if users_col.find_one({'email': payload.email.lower()}):
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Email already registered')
+async def _rehash_password(user_id: ObjectId, password: str, stored_hash: str) -> None:
+    new_hash = await hash_password_async(password)
+    # Only replace the hash we verified against, so a concurrent password change wins.
+    await users_col.update_one({'_id': user_id, 'password_hash': stored_hash}, {'$set': {'password_hash': new_hash}})
+
 
-    user_doc = {
-        'email': payload.email.lower(),
-        'password_hash': build_password_hash(payload.password),
-        'restaurant_name': payload.restaurant_name.strip(),
-        'template_id': 'classic-blue',
-        'created_at': datetime.now(timezone.utc),
-    }
-    users_col.insert_one(user_doc)
-    return RegisterResponse(message='Registered successfully. Please login.')
+@router.post('/register', response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
+async def register(payload: RegisterRequest) -> RegisterResponse:
+    with auth_latency['register'].time():
+        if await users_col.find_one({'email': payload.email.lower()}, {'_id': 1}):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Email already registered')
+
+        user_doc = {
+            'email': payload.email.lower(),
+            'password_hash': await hash_password_async(payload.password),
+            'restaurant_name': payload.restaurant_name.strip(),
+            'template_id': 'classic-blue',
+            'created_at': datetime.now(timezone.utc),
+        }
+        try:
+            await users_col.insert_one(user_doc)
+        except DuplicateKeyError as exc:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Email already registered') from exc
+        return RegisterResponse(message='Registered successfully. Please login.')
 
 
 @router.post('/login', response_model=AuthResponse)
-def login(payload: LoginRequest) -> AuthResponse:
-    user = users_col.find_one({'email': payload.email.lower()})
-    if not user or not verify_password(payload.password, user.get('password_hash', '')):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid email or password')
+async def login(payload: LoginRequest, background_tasks: BackgroundTasks) -> AuthResponse:
+    with auth_latency['login'].time():
+        user = await users_col.find_one({'email': payload.email.lower()}, USER_LOGIN_PROJECTION)
+        stored_hash = user.get('password_hash', '') if user else ''
+        if not user or not await verify_password_async(payload.password, stored_hash):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid email or password')
+
+        if password_needs_rehash(stored_hash):
+            background_tasks.add_task(_rehash_password, user['_id'], payload.password, stored_hash)
 
-    token = create_token(str(user['_id']))
-    return AuthResponse(access_token=token, user=parse_user(user))
+        token = create_token(str(user['_id']))
+        return AuthResponse(access_token=token, user=parse_user(user))
 
 
 @router.get('/me')
-def me(current_user=Depends(get_current_user)):
+async def me(current_user=Depends(get_current_user)):
     return {'user': parse_user(current_user)}
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Header, HTTPException, Response, status
+
+from app.core.blobs import DIGEST_PATTERN, blob_backend
+from app.core.http_cache import etag_matches
+from app.services.assets import blob_response
+
+router = APIRouter(prefix='/blobs', tags=['blobs'])
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+@router.get('/{digest}')
+async def get_blob(
+    digest: str,
+    if_none_match: str = Header(default=''),
+    range_header: str = Header(default='', alias='Range'),
+    if_range: str = Header(default=''),
+):
+    if not DIGEST_PATTERN.match(digest):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Blob not found')
+
+    etag = f'"{digest}"'
+    headers = {'ETag': etag, 'Cache-Control': IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    info = await blob_backend.info(digest)
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Blob not found')
+    return blob_response(info, None, headers, range_header, if_range)
@@ -1,96 +1,154 @@
 from datetime import datetime, timezone
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
 from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 
+from app.core.config import MAX_PAGE_LIMIT
 from app.core.database import categories_col, items_col
+from app.core.http_cache import cache_headers, not_modified_response
 from app.dependencies.auth import get_current_user
-from app.schemas.category import CategoryCreateRequest, CategoryResponse, CategoryUpdateRequest
-from app.services.categories import normalize_category_name
-from app.services.serializers import category_response
+from app.schemas.batch import BatchResponse
+from app.schemas.category import CategoryBatchRequest, CategoryCreateRequest, CategoryResponse, CategoryUpdateRequest
+from app.services.batch import run_category_batch
+from app.services.categories import adopt_legacy_items, category_items_filter, normalize_category_name
+from app.services.menu import CATEGORY_ITEMS_CHANGE, current_menu_version, mark_menu_changed, menu_etag, menu_images
+from app.services.pagination import CATEGORY_SORT_KEYS, fetch_page, page_limit
+from app.services.projections import (
+    CATEGORY_FIELDS,
+    CATEGORY_SUMMARY_FIELDS,
+    VIEW_PATTERN,
+    mongo_projection,
+    select_fields,
+)
+from app.services.serializers import category_fields, category_response
 
 router = APIRouter(prefix='/menu/categories', tags=['categories'])
 
 
 @router.get('')
-def get_categories(current_user=Depends(get_current_user)):
-    cursor = categories_col.find({'restaurant_id': current_user['_id']}).sort([('name', 1)])
-    return {'categories': [category_response(category).model_dump() for category in cursor]}
+async def get_categories(
+    view: str = Query(default='full', pattern=VIEW_PATTERN),
+    fields: str = Query(default=''),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = Query(default=''),
+    if_none_match: str = Header(default=''),
+    current_user=Depends(get_current_user),
+):
+    selected_fields = select_fields(view, fields, CATEGORY_FIELDS, CATEGORY_SUMMARY_FIELDS)
+    limit = page_limit(limit, cursor)
+    version = await current_menu_version(current_user['_id'])
+    etag = menu_etag(current_user['_id'], version, 'menu_categories', ','.join(selected_fields), limit, cursor)
+    not_modified = not_modified_response(if_none_match, etag, 'menu_categories')
+    if not_modified is not None:
+        return not_modified
+    headers = cache_headers(etag, 'menu_categories')
+
+    query = {'restaurant_id': current_user['_id']}
+    if limit is None:
+        rows = categories_col.find(query, mongo_projection(selected_fields)).sort([(key, 1) for key in CATEGORY_SORT_KEYS])
+        payload = {'categories': [category_fields(category, selected_fields) async for category in rows]}
+        return ORJSONResponse(payload, headers=headers)
+
+    docs, next_cursor = await fetch_page(
+        categories_col, query, mongo_projection(selected_fields), CATEGORY_SORT_KEYS, limit, cursor
+    )
+    payload = {'categories': [category_fields(category, selected_fields) for category in docs], 'next_cursor': next_cursor}
+    return ORJSONResponse(payload, headers=headers)
+
+
+@router.get('/{category_id}', response_model=CategoryResponse)
+async def get_category(category_id: str, current_user=Depends(get_current_user)) -> ORJSONResponse:
+    if not ObjectId.is_valid(category_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid category id')
+
+    category = await categories_col.find_one({'_id': ObjectId(category_id), 'restaurant_id': current_user['_id']})
+    if not category:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
+    return ORJSONResponse(category_response(category))
 
 
 @router.post('', response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
-def create_category(payload: CategoryCreateRequest, current_user=Depends(get_current_user)) -> CategoryResponse:
+async def create_category(payload: CategoryCreateRequest, current_user=Depends(get_current_user)) -> ORJSONResponse:
     normalized_name = normalize_category_name(payload.name)
     if not normalized_name:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Category name cannot be empty')
 
+    images = menu_images(current_user['_id'])
     doc = {
         'restaurant_id': current_user['_id'],
         'name': normalized_name,
         'name_key': normalized_name.lower(),
         'description': payload.description.strip(),
-        'image_url': payload.image_url.strip(),
+        'image_url': await images.store(payload.image_url.strip()),
         'created_at': datetime.now(timezone.utc),
     }
     try:
-        inserted = categories_col.insert_one(doc)
+        inserted = await categories_col.insert_one(doc)
     except DuplicateKeyError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Category already exists') from exc
+    await mark_menu_changed(current_user['_id'], [('category', inserted.inserted_id)])
+    images.announce()
+    return ORJSONResponse(category_response(doc), status_code=status.HTTP_201_CREATED)
 
-    created = categories_col.find_one({'_id': inserted.inserted_id})
-    return category_response(created)
+
+@router.post(':batch', response_model=BatchResponse)
+async def batch_categories(payload: CategoryBatchRequest, current_user=Depends(get_current_user)) -> ORJSONResponse:
+    return ORJSONResponse(await run_category_batch(current_user['_id'], payload))
 
 
 @router.put('/{category_id}', response_model=CategoryResponse)
-def update_category(
+async def update_category(
     category_id: str, payload: CategoryUpdateRequest, current_user=Depends(get_current_user)
-) -> CategoryResponse:
+) -> ORJSONResponse:
     if not ObjectId.is_valid(category_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid category id')
 
-    current = categories_col.find_one({'_id': ObjectId(category_id), 'restaurant_id': current_user['_id']})
-    if not current:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
-
     normalized_name = normalize_category_name(payload.name)
     if not normalized_name:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Category name cannot be empty')
 
+    images = menu_images(current_user['_id'])
+    fields = {
+        'name': normalized_name,
+        'name_key': normalized_name.lower(),
+        'description': payload.description.strip(),
+        'image_url': await images.store(payload.image_url.strip()),
+        'updated_at': datetime.now(timezone.utc),
+    }
     try:
-        categories_col.update_one(
-            {'_id': current['_id'], 'restaurant_id': current_user['_id']},
-            {
-                '$set': {
-                    'name': normalized_name,
-                    'name_key': normalized_name.lower(),
-                    'description': payload.description.strip(),
-                    'image_url': payload.image_url.strip(),
-                    'updated_at': datetime.now(timezone.utc),
-                }
-            },
+        # The previous version tells whether the name changed; the response is it plus what was set.
+        previous = await categories_col.find_one_and_update(
+            {'_id': ObjectId(category_id), 'restaurant_id': current_user['_id']}, {'$set': fields}
         )
     except DuplicateKeyError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Category already exists') from exc
+    if previous is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
 
-    if current.get('name') != normalized_name:
-        items_col.update_many(
-            {'restaurant_id': current_user['_id'], 'category': current.get('name', '')},
-            {'$set': {'category': normalized_name, 'updated_at': datetime.now(timezone.utc)}},
-        )
-
-    updated = categories_col.find_one({'_id': current['_id'], 'restaurant_id': current_user['_id']})
-    return category_response(updated)
+    changes = [('category', previous['_id'])]
+    if previous.get('name') != normalized_name:
+        await adopt_legacy_items(current_user['_id'], previous['_id'], previous.get('name', ''))
+        # Items carry their category's name, so every one of them changes with it.
+        changes.append((CATEGORY_ITEMS_CHANGE, previous['_id']))
+    await mark_menu_changed(current_user['_id'], changes)
+    images.announce()
+    return ORJSONResponse(category_response({**previous, **fields}))
 
 
 @router.delete('/{category_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(category_id: str, current_user=Depends(get_current_user)) -> None:
+async def delete_category(category_id: str, current_user=Depends(get_current_user)) -> None:
     if not ObjectId.is_valid(category_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid category id')
 
-    current = categories_col.find_one({'_id': ObjectId(category_id), 'restaurant_id': current_user['_id']})
-    if not current:
+    deleted = await categories_col.find_one_and_delete(
+        {'_id': ObjectId(category_id), 'restaurant_id': current_user['_id']}, projection={'name': 1}
+    )
+    if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
 
-    items_col.delete_many({'restaurant_id': current_user['_id'], 'category': current.get('name', '')})
-    categories_col.delete_one({'_id': current['_id'], 'restaurant_id': current_user['_id']})
+    # Delta clients drop a deleted category's items along with it.
+    await items_col.delete_many(category_items_filter(current_user['_id'], deleted['_id'], deleted.get('name', '')))
+    await mark_menu_changed(current_user['_id'], [('category', deleted['_id'])])
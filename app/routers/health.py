@@ -1,8 +1,35 @@
 from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.metrics import METRICS_CONTENT_TYPE, render_metrics
+from app.core.qr import qr_cache
+from app.dependencies.auth import principal_cache, token_cache
+from app.services.menu import public_menu_cache
+from app.services.passwords import auth_stats
 
 router = APIRouter(tags=['health'])
 
 
 @router.get('/health')
-def health():
+async def health():
     return {'status': 'ok'}
+
+
+@router.get('/health/cache')
+async def cache_stats():
+    return {
+        'public_menu': public_menu_cache.stats(),
+        'principals': principal_cache.stats(),
+        'tokens': token_cache.stats(),
+        'qr': qr_cache.stats(),
+    }
+
+
+@router.get('/health/auth')
+async def auth_health():
+    return auth_stats()
+
+
+@router.get('/metrics', include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
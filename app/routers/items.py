@@ -1,73 +1,153 @@
 from datetime import datetime, timezone
+from typing import Optional
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from pymongo import ReturnDocument
 
+from app.core.config import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from app.core.database import items_col
+from app.core.http_cache import cache_headers, not_modified_response
 from app.dependencies.auth import get_current_user
-from app.schemas.item import MenuItemCreateRequest, MenuItemResponse, MenuItemUpdateRequest
+from app.schemas.batch import BatchResponse
+from app.schemas.item import MenuItemBatchRequest, MenuItemCreateRequest, MenuItemResponse, MenuItemUpdateRequest
+from app.services.batch import run_item_batch
 from app.services.categories import require_existing_category
-from app.services.serializers import menu_item_response
+from app.services.items import (
+    fetch_items_page,
+    item_with_category_name,
+    list_items_in_menu_order,
+    load_category_order,
+    with_category_name,
+)
+from app.services.menu import current_menu_version, mark_menu_changed, menu_etag, menu_images
+from app.services.pagination import page_limit
+from app.services.projections import ITEM_FIELDS, ITEM_SUMMARY_FIELDS, VIEW_PATTERN, mongo_projection, select_fields
+from app.services.search import apply_item_changes, menu_search_index, search_page
+from app.services.serializers import menu_item_fields, menu_item_response
 
 router = APIRouter(prefix='/menu/items', tags=['items'])
 
 
 @router.post('', response_model=MenuItemResponse, status_code=status.HTTP_201_CREATED)
-def create_menu_item(payload: MenuItemCreateRequest, current_user=Depends(get_current_user)) -> MenuItemResponse:
-    saved_category_name = require_existing_category(current_user['_id'], payload.category)
+async def create_menu_item(payload: MenuItemCreateRequest, current_user=Depends(get_current_user)) -> ORJSONResponse:
+    category = await require_existing_category(current_user['_id'], payload.category)
+    images = menu_images(current_user['_id'])
     item_doc = {
         'restaurant_id': current_user['_id'],
         'name': payload.name.strip(),
-        'category': saved_category_name,
+        'category_id': category['_id'],
         'description': payload.description.strip(),
-        'image_url': payload.image_url.strip(),
+        'image_url': await images.store(payload.image_url.strip()),
         'price': round(payload.price, 2),
         'created_at': datetime.now(timezone.utc),
     }
-    inserted = items_col.insert_one(item_doc)
-    saved = items_col.find_one({'_id': inserted.inserted_id})
-    return menu_item_response(saved)
+    inserted = await items_col.insert_one(item_doc)
+    version = await mark_menu_changed(current_user['_id'], [('item', inserted.inserted_id)])
+    images.announce()
+    item = menu_item_response(with_category_name(item_doc, {category['_id']: category['name']}))
+    apply_item_changes(current_user['_id'], version, upserted=[item])
+    return ORJSONResponse(item, status_code=status.HTTP_201_CREATED)
+
+
+@router.post(':batch', response_model=BatchResponse)
+async def batch_menu_items(payload: MenuItemBatchRequest, current_user=Depends(get_current_user)) -> ORJSONResponse:
+    return ORJSONResponse(await run_item_batch(current_user['_id'], payload))
 
 
 @router.put('/{item_id}', response_model=MenuItemResponse)
-def update_menu_item(item_id: str, payload: MenuItemUpdateRequest, current_user=Depends(get_current_user)) -> MenuItemResponse:
+async def update_menu_item(item_id: str, payload: MenuItemUpdateRequest, current_user=Depends(get_current_user)) -> ORJSONResponse:
     if not ObjectId.is_valid(item_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid item id')
 
-    saved_category_name = require_existing_category(current_user['_id'], payload.category)
+    category = await require_existing_category(current_user['_id'], payload.category)
+    images = menu_images(current_user['_id'])
 
-    result = items_col.update_one(
+    updated = await items_col.find_one_and_update(
         {'_id': ObjectId(item_id), 'restaurant_id': current_user['_id']},
         {
             '$set': {
                 'name': payload.name.strip(),
-                'category': saved_category_name,
+                'category_id': category['_id'],
                 'description': payload.description.strip(),
-                'image_url': payload.image_url.strip(),
+                'image_url': await images.store(payload.image_url.strip()),
                 'price': round(payload.price, 2),
                 'updated_at': datetime.now(timezone.utc),
-            }
+            },
+            '$unset': {'category': ''},
         },
+        return_document=ReturnDocument.AFTER,
     )
 
-    if result.matched_count == 0:
+    if updated is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Item not found')
-
-    updated = items_col.find_one({'_id': ObjectId(item_id), 'restaurant_id': current_user['_id']})
-    return menu_item_response(updated)
+    version = await mark_menu_changed(current_user['_id'], [('item', ObjectId(item_id))])
+    images.announce()
+    item = menu_item_response(with_category_name(updated, {category['_id']: category['name']}))
+    apply_item_changes(current_user['_id'], version, upserted=[item])
+    return ORJSONResponse(item)
 
 
 @router.get('')
-def list_my_menu_items(current_user=Depends(get_current_user)):
-    cursor = items_col.find({'restaurant_id': current_user['_id']}).sort([('category', 1), ('name', 1)])
-    return {'items': [menu_item_response(item).model_dump() for item in cursor]}
+async def list_my_menu_items(
+    view: str = Query(default='full', pattern=VIEW_PATTERN),
+    fields: str = Query(default=''),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = Query(default=''),
+    if_none_match: str = Header(default=''),
+    current_user=Depends(get_current_user),
+):
+    selected_fields = select_fields(view, fields, ITEM_FIELDS, ITEM_SUMMARY_FIELDS)
+    limit = page_limit(limit, cursor)
+    version = await current_menu_version(current_user['_id'])
+    etag = menu_etag(current_user['_id'], version, 'menu_items', ','.join(selected_fields), limit, cursor)
+    not_modified = not_modified_response(if_none_match, etag, 'menu_items')
+    if not_modified is not None:
+        return not_modified
+    headers = cache_headers(etag, 'menu_items')
+
+    order = await load_category_order(current_user['_id'])
+    projection = mongo_projection(selected_fields)
+    if limit is None:
+        docs = await list_items_in_menu_order({'restaurant_id': current_user['_id']}, projection, order)
+        return ORJSONResponse({'items': [menu_item_fields(item, selected_fields) for item in docs]}, headers=headers)
+
+    docs, next_cursor = await fetch_items_page(current_user['_id'], projection, order, limit, cursor)
+    payload = {'items': [menu_item_fields(item, selected_fields) for item in docs], 'next_cursor': next_cursor}
+    return ORJSONResponse(payload, headers=headers)
+
+
+@router.get('/search')
+async def search_my_menu_items(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = Query(default=''),
+    current_user=Depends(get_current_user),
+) -> ORJSONResponse:
+    index = await menu_search_index(current_user['_id'])
+    items, next_cursor = search_page(index, q, limit, cursor)
+    return ORJSONResponse({'items': items, 'next_cursor': next_cursor})
+
+
+@router.get('/{item_id}', response_model=MenuItemResponse)
+async def get_menu_item(item_id: str, current_user=Depends(get_current_user)) -> ORJSONResponse:
+    if not ObjectId.is_valid(item_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid item id')
+
+    item = await items_col.find_one({'_id': ObjectId(item_id), 'restaurant_id': current_user['_id']})
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Item not found')
+    return ORJSONResponse(menu_item_response(await item_with_category_name(item)))
 
 
 @router.delete('/{item_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_menu_item(item_id: str, current_user=Depends(get_current_user)) -> None:
+async def delete_menu_item(item_id: str, current_user=Depends(get_current_user)) -> None:
     if not ObjectId.is_valid(item_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid item id')
 
-    result = items_col.delete_one({'_id': ObjectId(item_id), 'restaurant_id': current_user['_id']})
+    result = await items_col.delete_one({'_id': ObjectId(item_id), 'restaurant_id': current_user['_id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Item not found')
+    version = await mark_menu_changed(current_user['_id'], [('item', ObjectId(item_id))])
+    apply_item_changes(current_user['_id'], version, deleted=[item_id])
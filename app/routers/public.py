@@ -1,51 +1,176 @@
-from typing import Any, Dict, List
+from typing import Optional
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
-from app.core.database import categories_col, items_col, users_col
-from app.services.serializers import menu_item_response
-from app.services.templates import builtin_templates, find_template_for_restaurant
+from app.core.compression import response_encoding
+from app.core.config import CACHE_CONTROL_POLICIES, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.core.database import templates_col, users_col
+from app.core.http_cache import cache_headers, coded_etag, not_modified_response
+from app.services.assets import asset_response
+from app.services.changes import build_menu_changes
+from app.services.events import menu_event_stream, menu_events
+from app.services.menu import (
+    build_public_menu,
+    encoded_menu_payload,
+    get_public_menu_snapshot,
+    menu_etag,
+    menu_version,
+    public_menu_payload,
+)
+from app.services.media import public_image_fields, variants_for_urls
+from app.services.pagination import page_limit
+from app.services.projections import PUBLIC_RESTAURANT_PROJECTION
+from app.services.search import menu_search_index, search_page
 
 router = APIRouter(prefix='/public', tags=['public'])
 
 
 @router.get('/menu/{restaurant_id}')
-def public_menu(restaurant_id: str) -> Dict[str, Any]:
+async def public_menu(
+    request: Request,
+    restaurant_id: str,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = Query(default=''),
+    if_none_match: str = Header(default=''),
+) -> Response:
     if not ObjectId.is_valid(restaurant_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Restaurant not found')
 
-    restaurant = users_col.find_one({'_id': ObjectId(restaurant_id)})
+    limit = page_limit(limit, cursor)
+    if limit is not None:
+        return await _public_menu_page(ObjectId(restaurant_id), limit, cursor, if_none_match)
+
+    snapshot = await get_public_menu_snapshot(ObjectId(restaurant_id))
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Restaurant not found')
+
+    encoding = response_encoding(request.scope, len(snapshot.payload))
+    etag = coded_etag(snapshot.etag, encoding)
+    not_modified = not_modified_response(if_none_match, etag, 'public_menu')
+    if not_modified is not None:
+        not_modified.headers['Vary'] = 'Accept-Encoding'
+        return not_modified
+
+    headers = {**cache_headers(etag, 'public_menu'), 'Vary': 'Accept-Encoding'}
+    if encoding is None:
+        return Response(content=snapshot.payload, media_type='application/json', headers=headers)
+    # Precompressed here, so the compression middleware passes it through untouched.
+    return Response(
+        content=await encoded_menu_payload(ObjectId(restaurant_id), snapshot, encoding),
+        media_type='application/json',
+        headers={**headers, 'Content-Encoding': encoding},
+    )
+
+
+async def _public_menu_page(restaurant_id: ObjectId, limit: int, cursor: str, if_none_match: str) -> Response:
+    # Pages walk categories in name order; each page carries every item of its categories.
+    restaurant = await users_col.find_one({'_id': restaurant_id}, PUBLIC_RESTAURANT_PROJECTION)
     if not restaurant:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Restaurant not found')
 
-    selected_template_id = restaurant.get('template_id', 'classic-blue')
-    selected_template = find_template_for_restaurant(restaurant['_id'], selected_template_id)
-    if not selected_template:
-        selected_template = builtin_templates()[0]
-
-    categories_cursor = categories_col.find({'restaurant_id': restaurant['_id']})
-    category_meta: Dict[str, Dict[str, str]] = {}
-    for category_doc in categories_cursor:
-        category_meta[category_doc['name']] = {
-            'description': category_doc.get('description', ''),
-            'image_url': category_doc.get('image_url', ''),
-        }
-
-    items_cursor = items_col.find({'restaurant_id': restaurant['_id']}).sort([('category', 1), ('name', 1)])
-    items = [menu_item_response(item).model_dump() for item in items_cursor]
-
-    categories: Dict[str, List[Dict[str, Any]]] = {}
-    for item in items:
-        categories.setdefault(item['category'], []).append(item)
-
-    return {
-        'restaurant_id': str(restaurant['_id']),
-        'restaurant_name': restaurant['restaurant_name'],
-        'template_id': selected_template['id'],
-        'template_style_id': selected_template['style_id'],
-        'template_asset_url': selected_template.get('asset_url', ''),
-        'template_asset_type': selected_template.get('asset_type', ''),
-        'category_meta': category_meta,
-        'categories': categories,
-    }
+    etag = menu_etag(restaurant_id, menu_version(restaurant), 'public_menu', limit, cursor)
+    not_modified = not_modified_response(if_none_match, etag, 'public_menu')
+    if not_modified is not None:
+        not_modified.headers['Vary'] = 'Accept-Encoding'
+        return not_modified
+    # Compressed by the middleware, which weakens the tag when it does.
+    return Response(
+        content=public_menu_payload(await build_public_menu(restaurant, limit, cursor)),
+        media_type='application/json',
+        headers={**cache_headers(etag, 'public_menu'), 'Vary': 'Accept-Encoding'},
+    )
+
+
+@router.get('/menu/{restaurant_id}/changes')
+async def public_menu_changes(
+    restaurant_id: str,
+    since: int = Query(ge=0),
+    if_none_match: str = Header(default=''),
+) -> Response:
+    # Delta sync: `seq` is the menu version; pass it back as `since` on the next call.
+    restaurant = None
+    if ObjectId.is_valid(restaurant_id):
+        restaurant = await users_col.find_one(
+            {'_id': ObjectId(restaurant_id)}, {**PUBLIC_RESTAURANT_PROJECTION, 'menu_changes': 1}
+        )
+    if not restaurant:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Restaurant not found')
+
+    etag = menu_etag(restaurant['_id'], menu_version(restaurant), 'public_menu_changes', since)
+    not_modified = not_modified_response(if_none_match, etag, 'public_menu')
+    if not_modified is not None:
+        return not_modified
+    return ORJSONResponse(await build_menu_changes(restaurant, since), headers=cache_headers(etag, 'public_menu'))
+
+
+@router.get('/menu/{restaurant_id}/events')
+async def public_menu_events(restaurant_id: str, last_event_id: str = Header(default='')) -> StreamingResponse:
+    if not ObjectId.is_valid(restaurant_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Restaurant not found')
+
+    # Subscribed before reading the version, so a write landing in between is still pushed.
+    subscription = menu_events.subscribe(ObjectId(restaurant_id))
+    restaurant = await users_col.find_one({'_id': ObjectId(restaurant_id)}, {'menu_version': 1})
+    if not restaurant:
+        menu_events.unsubscribe(subscription)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Restaurant not found')
+    return StreamingResponse(
+        menu_event_stream(subscription, menu_version(restaurant), last_event_id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get('/menu/{restaurant_id}/template/asset')
+async def public_template_asset(
+    restaurant_id: str,
+    if_none_match: str = Header(default=''),
+    range_header: str = Header(default='', alias='Range'),
+    if_range: str = Header(default=''),
+) -> Response:
+    # Serves the selected custom template's file for menus whose upload predates blob storage.
+    restaurant = None
+    if ObjectId.is_valid(restaurant_id):
+        restaurant = await users_col.find_one({'_id': ObjectId(restaurant_id)}, {'template_id': 1})
+    template = None
+    if restaurant and ObjectId.is_valid(restaurant.get('template_id', '')):
+        template = await templates_col.find_one(
+            {'_id': ObjectId(restaurant['template_id']), 'restaurant_id': restaurant['_id']}, {'asset_url': 1}
+        )
+    response = None
+    if template and template.get('asset_url'):
+        response = await asset_response(
+            template['asset_url'],
+            CACHE_CONTROL_POLICIES['public_template_asset'],
+            if_none_match,
+            range_header,
+            if_range,
+        )
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Template asset not found')
+    return response
+
+
+@router.get('/menu/{restaurant_id}/search')
+async def search_public_menu(
+    restaurant_id: str,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = Query(default=''),
+    if_none_match: str = Header(default=''),
+) -> Response:
+    index = await menu_search_index(ObjectId(restaurant_id)) if ObjectId.is_valid(restaurant_id) else None
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Restaurant not found')
+
+    etag = menu_etag(ObjectId(restaurant_id), index.version, 'public_menu_search', q, limit, cursor)
+    not_modified = not_modified_response(if_none_match, etag, 'public_menu')
+    if not_modified is not None:
+        return not_modified
+
+    items, next_cursor = search_page(index, q, limit, cursor)
+    variants_by_digest = await variants_for_urls([item['image_url'] for item in items])
+    results = [{**item, **public_image_fields(item['image_url'], variants_by_digest)} for item in items]
+    return ORJSONResponse({'items': results, 'next_cursor': next_cursor}, headers=cache_headers(etag, 'public_menu'))
@@ -1,16 +1,63 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.core.config import FRONTEND_BASE_URL
-from app.core.qr import generate_qr_data_url
+from app.core.http_cache import cache_headers, make_etag, not_modified_response
+from app.core.qr import QR_MEDIA_TYPES, get_qr, qr_data_url
 from app.dependencies.auth import get_current_user
+from app.services.transfer import export_menu_lines, import_menu_lines
 
 router = APIRouter(prefix='/restaurant', tags=['restaurant'])
 
+ERROR_CORRECTION_PATTERN = '^[LMQH]$'
+
+
+def _menu_url(current_user) -> str:
+    return f"{FRONTEND_BASE_URL}/menu/{str(current_user['_id'])}"
+
 
 @router.get('/qr')
-def restaurant_qr(current_user=Depends(get_current_user)):
-    url = f"{FRONTEND_BASE_URL}/menu/{str(current_user['_id'])}"
+async def restaurant_qr(
+    box_size: int = Query(default=8, ge=1, le=40),
+    error_correction: str = Query(default='M', pattern=ERROR_CORRECTION_PATTERN),
+    current_user=Depends(get_current_user),
+):
+    url = _menu_url(current_user)
     return {
         'target_url': url,
-        'qr_data_url': generate_qr_data_url(url),
+        'qr_data_url': qr_data_url(await get_qr(url, box_size, error_correction, 'png'), 'png'),
     }
+
+
+@router.get('/qr.{image_format}')
+async def restaurant_qr_image(
+    image_format: str = Path(pattern='^(png|svg)$'),
+    box_size: int = Query(default=8, ge=1, le=40),
+    error_correction: str = Query(default='M', pattern=ERROR_CORRECTION_PATTERN),
+    if_none_match: str = Header(default=''),
+    current_user=Depends(get_current_user),
+) -> Response:
+    url = _menu_url(current_user)
+    etag = make_etag('restaurant_qr', url, box_size, error_correction, image_format)
+    not_modified = not_modified_response(if_none_match, etag, 'restaurant_qr')
+    if not_modified is not None:
+        return not_modified
+
+    data = await get_qr(url, box_size, error_correction, image_format)
+    return Response(content=data, media_type=QR_MEDIA_TYPES[image_format], headers=cache_headers(etag, 'restaurant_qr'))
+
+
+@router.get('/export')
+async def export_menu(include_media: bool = Query(default=False), current_user=Depends(get_current_user)) -> StreamingResponse:
+    filename = f"menu-{str(current_user['_id'])}.ndjson"
+    return StreamingResponse(
+        export_menu_lines(current_user['_id'], include_media),
+        media_type='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post('/import')
+async def import_menu(request: Request, current_user=Depends(get_current_user)):
+    # The body is raw NDJSON as produced by /restaurant/export, read incrementally.
+    return await import_menu_lines(current_user['_id'], request.stream())
@@ -1,24 +1,43 @@
 from datetime import datetime, timezone
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse
 from bson import ObjectId
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 
-from app.core.database import templates_col, users_col
-from app.dependencies.auth import get_current_user
+from app.core.blobs import TEMPLATE_ASSET_CONTENT_TYPES, blob_info_for_url
+from app.core.config import CACHE_CONTROL_POLICIES, MAX_PAGE_LIMIT
+from app.core.database import templates_col
+from app.core.http_cache import cache_headers, not_modified_response
+from app.dependencies.auth import get_current_user, invalidate_principal
 from app.schemas.template import TemplateCreateRequest, TemplateResponse, TemplateSelectionRequest, TemplateUpdateRequest
-from app.services.serializers import parse_user, template_response
+from app.services.assets import asset_response
+from app.services.media import ImageUploads
+from app.services.menu import current_menu_version, mark_menu_changed, menu_etag, menu_images, record_menu_change
+from app.services.pagination import page_limit
+from app.services.projections import (
+    TEMPLATE_FIELDS,
+    TEMPLATE_SUMMARY_FIELDS,
+    VIEW_PATTERN,
+    mongo_projection,
+    select_fields,
+)
+from app.services.serializers import parse_user, template_fields, template_response
 from app.services.templates import (
     all_templates_for_restaurant,
     builtin_templates,
+    custom_template,
     find_template_for_restaurant,
     normalize_template_name,
+    templates_page_for_restaurant,
 )
 
 router = APIRouter(tags=['templates'])
 
 
-def _resolve_template_asset_fields(asset_url_raw: str, asset_type_raw: str):
+async def _resolve_template_asset_fields(images: ImageUploads, asset_url_raw: str, asset_type_raw: str):
     asset_url = asset_url_raw.strip()
     asset_type = asset_type_raw.strip().lower()
 
@@ -31,35 +50,97 @@ def _resolve_template_asset_fields(asset_url_raw: str, asset_type_raw: str):
         elif asset_url.startswith('data:application/pdf'):
             asset_type = 'pdf'
         else:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid template file type')
+            blob_info = await blob_info_for_url(asset_url)
+            if blob_info and blob_info.content_type.startswith('image/'):
+                asset_type = 'image'
+            elif blob_info and blob_info.content_type == 'application/pdf':
+                asset_type = 'pdf'
+            else:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid template file type')
 
     if asset_type and not asset_url:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Template file is required for file type')
 
-    if asset_type not in {'image', 'pdf'}:
+    if asset_type not in TEMPLATE_ASSET_CONTENT_TYPES:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid template file type')
 
-    return asset_url, asset_type
+    # An explicit asset_type still has to match what the data URL actually holds.
+    return await images.store(asset_url, TEMPLATE_ASSET_CONTENT_TYPES[asset_type]), asset_type
 
 
 @router.get('/templates')
-def get_templates(current_user=Depends(get_current_user)):
+async def get_templates(current_user=Depends(get_current_user)):
     return {'templates': builtin_templates()}
 
 
 @router.get('/restaurant/templates')
-def get_restaurant_templates(current_user=Depends(get_current_user)):
-    templates = all_templates_for_restaurant(current_user['_id'])
-    return {'templates': [template_response(tpl).model_dump() for tpl in templates]}
+async def get_restaurant_templates(
+    view: str = Query(default='full', pattern=VIEW_PATTERN),
+    fields: str = Query(default=''),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = Query(default=''),
+    if_none_match: str = Header(default=''),
+    current_user=Depends(get_current_user),
+):
+    selected_fields = select_fields(view, fields, TEMPLATE_FIELDS, TEMPLATE_SUMMARY_FIELDS)
+    limit = page_limit(limit, cursor)
+    version = await current_menu_version(current_user['_id'])
+    etag = menu_etag(current_user['_id'], version, 'restaurant_templates', ','.join(selected_fields), limit, cursor)
+    not_modified = not_modified_response(if_none_match, etag, 'restaurant_templates')
+    if not_modified is not None:
+        return not_modified
+    headers = cache_headers(etag, 'restaurant_templates')
+
+    projection = mongo_projection(selected_fields, always=('name',))
+    if limit is None:
+        templates = await all_templates_for_restaurant(current_user['_id'], projection)
+        payload = {'templates': [template_fields(tpl, selected_fields) for tpl in templates]}
+        return ORJSONResponse(payload, headers=headers)
+
+    templates, next_cursor = await templates_page_for_restaurant(current_user['_id'], projection, limit, cursor)
+    payload = {'templates': [template_fields(tpl, selected_fields) for tpl in templates], 'next_cursor': next_cursor}
+    return ORJSONResponse(payload, headers=headers)
+
+
+@router.get('/restaurant/templates/{template_id}', response_model=TemplateResponse)
+async def get_restaurant_template(template_id: str, current_user=Depends(get_current_user)) -> ORJSONResponse:
+    template = await find_template_for_restaurant(current_user['_id'], template_id)
+    if not template:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Template not found')
+    return ORJSONResponse(template_response(template))
+
+
+@router.get('/restaurant/templates/{template_id}/asset')
+async def get_restaurant_template_asset(
+    template_id: str,
+    if_none_match: str = Header(default=''),
+    range_header: str = Header(default='', alias='Range'),
+    if_range: str = Header(default=''),
+    current_user=Depends(get_current_user),
+) -> Response:
+    template = None
+    if ObjectId.is_valid(template_id):
+        template = await templates_col.find_one(
+            {'_id': ObjectId(template_id), 'restaurant_id': current_user['_id']}, {'asset_url': 1}
+        )
+    response = None
+    if template and template.get('asset_url'):
+        response = await asset_response(
+            template['asset_url'], CACHE_CONTROL_POLICIES['template_asset'], if_none_match, range_header, if_range
+        )
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Template asset not found')
+    return response
 
 
 @router.post('/restaurant/templates', response_model=TemplateResponse, status_code=status.HTTP_201_CREATED)
-def create_restaurant_template(payload: TemplateCreateRequest, current_user=Depends(get_current_user)) -> TemplateResponse:
+async def create_restaurant_template(payload: TemplateCreateRequest, current_user=Depends(get_current_user)) -> ORJSONResponse:
     template_name = normalize_template_name(payload.name)
     if not template_name:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Template name cannot be empty')
 
-    asset_url, asset_type = _resolve_template_asset_fields(payload.asset_url, payload.asset_type)
+    images = menu_images(current_user['_id'])
+    asset_url, asset_type = await _resolve_template_asset_fields(images, payload.asset_url, payload.asset_type)
 
     doc = {
         'restaurant_id': current_user['_id'],
@@ -72,28 +153,18 @@ def create_restaurant_template(payload: TemplateCreateRequest, current_user=Depe
     }
 
     try:
-        inserted = templates_col.insert_one(doc)
+        inserted = await templates_col.insert_one(doc)
     except DuplicateKeyError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Template already exists') from exc
-
-    created = templates_col.find_one({'_id': inserted.inserted_id})
-    return template_response(
-        {
-            'id': str(created['_id']),
-            'name': created['name'],
-            'description': created.get('description', ''),
-            'style_id': 'custom-upload',
-            'is_custom': True,
-            'asset_url': created.get('asset_url', ''),
-            'asset_type': created.get('asset_type', ''),
-        }
-    )
+    await mark_menu_changed(current_user['_id'], [('template', inserted.inserted_id)])
+    images.announce()
+    return ORJSONResponse(template_response(custom_template(doc)), status_code=status.HTTP_201_CREATED)
 
 
 @router.put('/restaurant/templates/{template_id}', response_model=TemplateResponse)
-def update_restaurant_template(
+async def update_restaurant_template(
     template_id: str, payload: TemplateUpdateRequest, current_user=Depends(get_current_user)
-) -> TemplateResponse:
+) -> ORJSONResponse:
     if not ObjectId.is_valid(template_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid template id')
 
@@ -101,10 +172,11 @@ def update_restaurant_template(
     if not template_name:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Template name cannot be empty')
 
-    asset_url, asset_type = _resolve_template_asset_fields(payload.asset_url, payload.asset_type)
+    images = menu_images(current_user['_id'])
+    asset_url, asset_type = await _resolve_template_asset_fields(images, payload.asset_url, payload.asset_type)
 
     try:
-        result = templates_col.update_one(
+        updated = await templates_col.find_one_and_update(
             {'_id': ObjectId(template_id), 'restaurant_id': current_user['_id']},
             {
                 '$set': {
@@ -116,52 +188,47 @@ def update_restaurant_template(
                     'updated_at': datetime.now(timezone.utc),
                 }
             },
+            return_document=ReturnDocument.AFTER,
         )
     except DuplicateKeyError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Template already exists') from exc
 
-    if result.matched_count == 0:
+    if updated is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Template not found')
-
-    updated = templates_col.find_one({'_id': ObjectId(template_id), 'restaurant_id': current_user['_id']})
-    return template_response(
-        {
-            'id': str(updated['_id']),
-            'name': updated['name'],
-            'description': updated.get('description', ''),
-            'style_id': 'custom-upload',
-            'is_custom': True,
-            'asset_url': updated.get('asset_url', ''),
-            'asset_type': updated.get('asset_type', ''),
-        }
-    )
+    await mark_menu_changed(current_user['_id'], [('template', ObjectId(template_id))])
+    images.announce()
+    return ORJSONResponse(template_response(custom_template(updated)))
 
 
 @router.delete('/restaurant/templates/{template_id}')
-def delete_restaurant_template(template_id: str, current_user=Depends(get_current_user)):
+async def delete_restaurant_template(template_id: str, current_user=Depends(get_current_user)):
     if not ObjectId.is_valid(template_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid template id')
 
-    existing = templates_col.find_one({'_id': ObjectId(template_id), 'restaurant_id': current_user['_id']})
-    if not existing:
+    result = await templates_col.delete_one({'_id': ObjectId(template_id), 'restaurant_id': current_user['_id']})
+    if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Template not found')
 
-    templates_col.delete_one({'_id': ObjectId(template_id), 'restaurant_id': current_user['_id']})
-
-    user_doc = current_user
-    if current_user.get('template_id') == template_id:
-        users_col.update_one({'_id': current_user['_id']}, {'$set': {'template_id': 'classic-blue'}})
-        user_doc = users_col.find_one({'_id': current_user['_id']})
-
-    return {'user': parse_user(user_doc)}
+    # Falls back to the default template if this one was selected. The cached principal can miss a
+    # selection made on another worker, so the stored value decides, within the version bump.
+    reset = {'template_id': {'$cond': [{'$eq': ['$template_id', template_id]}, 'classic-blue', '$template_id']}}
+    restaurant = await record_menu_change(
+        current_user['_id'], [('template', ObjectId(template_id))], reset, fields=['template_id']
+    )
+    user = current_user
+    if restaurant.get('template_id') != current_user.get('template_id'):
+        invalidate_principal(current_user['_id'])
+        user = {**current_user, 'template_id': restaurant.get('template_id')}
+    return {'user': parse_user(user)}
 
 
 @router.put('/restaurant/template')
-def set_template(payload: TemplateSelectionRequest, current_user=Depends(get_current_user)):
-    selected = find_template_for_restaurant(current_user['_id'], payload.template_id)
+async def set_template(payload: TemplateSelectionRequest, current_user=Depends(get_current_user)):
+    selected = await find_template_for_restaurant(current_user['_id'], payload.template_id, {'name': 1})
     if not selected:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid template id')
 
-    users_col.update_one({'_id': current_user['_id']}, {'$set': {'template_id': selected['id']}})
-    user = users_col.find_one({'_id': current_user['_id']})
-    return {'user': parse_user(user)}
+    selection = {'template_id': {'$literal': selected['id']}}
+    await mark_menu_changed(current_user['_id'], [('restaurant', current_user['_id'])], selection)
+    invalidate_principal(current_user['_id'])
+    return {'user': parse_user({**current_user, 'template_id': selected['id']})}
@@ -0,0 +1,30 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+BATCH_OP_PATTERN = '^(create|update|delete)$'
+
+
+def require_batch_operation_fields(op: str, op_id: str, data: Optional[BaseModel]) -> None:
+    if op in ('update', 'delete') and not op_id:
+        raise ValueError(f'{op} operations require an id')
+    if op in ('create', 'update') and data is None:
+        raise ValueError(f'{op} operations require data')
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: str = ''
+    detail: str = ''
+    data: Optional[Dict[str, Any]] = None
+
+
+class BatchResponse(BaseModel):
+    ordered: bool
+    inserted: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[BatchOperationResult]
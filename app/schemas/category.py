@@ -1,4 +1,9 @@
-from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.core.config import BATCH_MAX_OPERATIONS
+from app.schemas.batch import BATCH_OP_PATTERN, require_batch_operation_fields
 
 
 class CategoryCreateRequest(BaseModel):
@@ -19,3 +24,19 @@ class CategoryResponse(BaseModel):
     name: str
     description: str
     image_url: str
+
+
+class CategoryBatchOperation(BaseModel):
+    op: str = Field(pattern=BATCH_OP_PATTERN)
+    id: str = ''
+    data: Optional[CategoryCreateRequest] = None
+
+    @model_validator(mode='after')
+    def validate_operation(self) -> 'CategoryBatchOperation':
+        require_batch_operation_fields(self.op, self.id, self.data)
+        return self
+
+
+class CategoryBatchRequest(BaseModel):
+    operations: List[CategoryBatchOperation] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
+    ordered: bool = True
@@ -1,4 +1,9 @@
-from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.core.config import BATCH_MAX_OPERATIONS
+from app.schemas.batch import BATCH_OP_PATTERN, require_batch_operation_fields
 
 
 class MenuItemCreateRequest(BaseModel):
@@ -25,3 +30,19 @@ class MenuItemResponse(BaseModel):
     description: str
     image_url: str
     price: float
+
+
+class MenuItemBatchOperation(BaseModel):
+    op: str = Field(pattern=BATCH_OP_PATTERN)
+    id: str = ''
+    data: Optional[MenuItemCreateRequest] = None
+
+    @model_validator(mode='after')
+    def validate_operation(self) -> 'MenuItemBatchOperation':
+        require_batch_operation_fields(self.op, self.id, self.data)
+        return self
+
+
+class MenuItemBatchRequest(BaseModel):
+    operations: List[MenuItemBatchOperation] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
+    ordered: bool = True
@@ -0,0 +1,20 @@
+import asyncio
+from typing import Tuple
+
+from app.core.database import categories_col, items_col
+from app.services.categories import adopt_legacy_items
+
+
+async def backfill_category_ids() -> Tuple[int, int]:
+    # Safe to run while the API serves traffic: each pass only touches items that still lack
+    # a category_id, and re-running it is a no-op once every item is adopted.
+    adopted = 0
+    async for category in categories_col.find({}, {'restaurant_id': 1, 'name': 1}):
+        adopted += await adopt_legacy_items(category['restaurant_id'], category['_id'], category['name'])
+    orphaned = await items_col.count_documents({'category_id': {'$exists': False}})
+    return adopted, orphaned
+
+
+if __name__ == '__main__':
+    adopted, orphaned = asyncio.run(backfill_category_ids())
+    print(f'Linked {adopted} menu items to their category ids ({orphaned} items still have no matching category)')
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import sys
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.database import close_client, published_menus_col, users_col
+from app.services.menu import build_public_menu, menu_version, public_menu_payload, rebuild_published_menu
+from app.services.projections import PUBLIC_RESTAURANT_PROJECTION
+
+CHECK_CONCURRENCY = 8
+
+
+async def check_menu(restaurant_id: ObjectId) -> Tuple[str, str]:
+    # Compares the stored document with a fresh aggregation; edits made while checking can show up as 'stale'.
+    restaurant = await users_col.find_one({'_id': restaurant_id}, PUBLIC_RESTAURANT_PROJECTION)
+    if not restaurant:
+        return 'not found', ''
+    published = await published_menus_col.find_one({'_id': restaurant_id})
+    if published is None:
+        return 'missing', ''
+    version = menu_version(restaurant)
+    if published['version'] < version:
+        return 'stale', f'version {published["version"]} < {version}'
+    if published.get('payload') is None:
+        return 'ok', 'too large to store, built on read'
+    if published['payload'] != public_menu_payload(await build_public_menu(restaurant)):
+        return 'mismatch', f'version {version}'
+    return 'ok', ''
+
+
+async def check_all(restaurant_ids: List[ObjectId], repair: bool, concurrency: int) -> List[Tuple[ObjectId, str, str]]:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def check_one(restaurant_id: ObjectId) -> Tuple[ObjectId, str, str]:
+        async with slots:
+            state, detail = await check_menu(restaurant_id)
+            if repair and state in ('missing', 'stale', 'mismatch'):
+                await rebuild_published_menu(restaurant_id)
+            return restaurant_id, state, detail
+
+    return await asyncio.gather(*(check_one(restaurant_id) for restaurant_id in restaurant_ids))
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m app.scripts.check_published_menus',
+        description='Compare each materialized public menu with a fresh build of it.',
+    )
+    parser.add_argument('restaurant_ids', nargs='*', help='only these restaurants (default: all)')
+    parser.add_argument('--repair', action='store_true', help='rebuild every menu that does not match')
+    parser.add_argument('--concurrency', type=int, default=CHECK_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.restaurant_ids:
+            restaurant_ids = [ObjectId(value) for value in args.restaurant_ids if ObjectId.is_valid(value)]
+        else:
+            restaurant_ids = [doc['_id'] async for doc in users_col.find({}, {'_id': 1})]
+        results = await check_all(restaurant_ids, args.repair, max(1, args.concurrency))
+    finally:
+        await close_client()
+
+    problems = [(restaurant_id, state, detail) for restaurant_id, state, detail in results if state != 'ok']
+    for restaurant_id, state, detail in problems:
+        print(f'{restaurant_id}  {state:<9} {detail}'.rstrip())
+    repaired = ', rebuilt' if args.repair else ''
+    print(f'Checked {len(results)} menus: {len(problems)} out of sync{repaired}')
+    return 1 if problems and not args.repair else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,42 @@
+import asyncio
+
+from app.core.blobs import blob_backend, blob_digest_from_url
+from app.core.config import IMAGE_VARIANT_WORKERS
+from app.core.database import categories_col, items_col, templates_col
+from app.core.images import RESIZABLE_CONTENT_TYPES, render_variants_in_pool
+from app.services.media import save_variants, variants_col
+
+IMAGE_FIELDS = [
+    (items_col, 'image_url'),
+    (categories_col, 'image_url'),
+    (templates_col, 'asset_url'),
+]
+
+
+async def _generate(digest: str, limiter: asyncio.Semaphore) -> bool:
+    async with limiter:
+        info = await blob_backend.info(digest)
+        if info is None or info.content_type not in RESIZABLE_CONTENT_TYPES:
+            return False
+        data = b''.join([chunk async for chunk in blob_backend.iter_chunks(digest)])
+        await save_variants(digest, await render_variants_in_pool(data))
+        return True
+
+
+async def generate_missing_variants() -> int:
+    digests = set()
+    for collection, field in IMAGE_FIELDS:
+        async for doc in collection.find({field: {'$regex': '^/blobs/'}}, {field: 1}):
+            digest = blob_digest_from_url(doc[field])
+            if digest:
+                digests.add(digest)
+
+    existing = {doc['_id'] async for doc in variants_col.find({'_id': {'$in': list(digests)}}, {'_id': 1})}
+    # Only keep as many source images in memory as the pool can render at once.
+    limiter = asyncio.Semaphore(IMAGE_VARIANT_WORKERS)
+    results = await asyncio.gather(*(_generate(digest, limiter) for digest in digests - existing))
+    return sum(results)
+
+
+if __name__ == '__main__':
+    print(f'Generated variants for {asyncio.run(generate_missing_variants())} images')
@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from app.core.database import close_client
+from app.migrations import MIGRATIONS, MigrationLocked, is_stale_claim, migration_records, run_migrations
+
+
+async def show_status() -> int:
+    records = await migration_records()
+    for migration in MIGRATIONS:
+        record = records.get(migration.version, {})
+        state = record.get('state', 'pending')
+        # A running claim is not applied; its start time shows how long it has been held.
+        when = record.get('applied_at') if state == 'applied' else record.get('started_at')
+        if state == 'running' and is_stale_claim(record):
+            state = 'stale'
+        print(f"{migration.version}  {migration.name:<36} {state:<8} {when.isoformat() if when else ''}".rstrip())
+    return 0
+
+
+async def apply_pending(force_unlock: bool = False) -> int:
+    try:
+        applied = await run_migrations(force_unlock)
+    except MigrationLocked as exc:
+        print(exc, file=sys.stderr)
+        print('If that runner is gone, retry with --force-unlock', file=sys.stderr)
+        return 1
+    for migration in applied:
+        print(f'Applied {migration.version}_{migration.name}')
+    if not applied:
+        print('Database is up to date')
+    return 0
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.scripts.migrate', description='Apply versioned database migrations.')
+    parser.add_argument('command', nargs='?', choices=('up', 'status'), default='up')
+    parser.add_argument(
+        '--force-unlock', action='store_true', help='take over a migration another runner claimed and never finished'
+    )
+    args = parser.parse_args(argv)
+    try:
+        return await (show_status() if args.command == 'status' else apply_pending(args.force_unlock))
+    finally:
+        await close_client()
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Set
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.core.blobs import IMAGE_CONTENT_TYPES, TEMPLATE_ASSET_CONTENT_TYPES, externalize_data_url
+from app.core.database import categories_col, items_col, templates_col, users_col
+from app.services.menu import menu_change_update, rebuild_published_menu
+
+INLINE_FIELDS = [
+    (items_col, 'image_url', IMAGE_CONTENT_TYPES),
+    (categories_col, 'image_url', IMAGE_CONTENT_TYPES),
+    (templates_col, 'asset_url', frozenset().union(*TEMPLATE_ASSET_CONTENT_TYPES.values())),
+]
+
+
+async def migrate_inline_blobs() -> int:
+    touched_restaurants: Set[ObjectId] = set()
+    migrated = 0
+    for collection, field, allowed_types in INLINE_FIELDS:
+        cursor = collection.find({field: {'$regex': '^data:'}}, {field: 1, 'restaurant_id': 1})
+        async for doc in cursor:
+            try:
+                blob_url = await externalize_data_url(doc[field], allowed_types)
+            except HTTPException:
+                # Types uploads no longer accept stay inline rather than landing in the blob store.
+                continue
+            if blob_url == doc[field]:
+                continue
+            # Only replace the value we read so a concurrent owner edit is never overwritten.
+            result = await collection.update_one({'_id': doc['_id'], field: doc[field]}, {'$set': {field: blob_url}})
+            if result.modified_count:
+                migrated += 1
+                touched_restaurants.add(doc['restaurant_id'])
+
+    if touched_restaurants:
+        await users_col.update_many({'_id': {'$in': list(touched_restaurants)}}, menu_change_update())
+        for restaurant_id in touched_restaurants:
+            await rebuild_published_menu(restaurant_id)
+    return migrated
+
+
+if __name__ == '__main__':
+    print(f'Moved {asyncio.run(migrate_inline_blobs())} inline data URLs into the blob store')
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from bson import ObjectId
+
+from app.core.config import PUBLISH_CONCURRENCY, PUBLISH_DIR
+from app.core.database import close_client, users_col
+from app.services.publishing import PublishedMenu, publish_menu
+
+
+async def publish_all(restaurant_ids: List[ObjectId], concurrency: int) -> List[Optional[PublishedMenu]]:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def publish_one(restaurant_id: ObjectId) -> Optional[PublishedMenu]:
+        async with slots:
+            return await publish_menu(restaurant_id)
+
+    return await asyncio.gather(*(publish_one(restaurant_id) for restaurant_id in restaurant_ids))
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m app.scripts.publish_menus', description='Write the static public menu of every restaurant.'
+    )
+    parser.add_argument('restaurant_ids', nargs='*', help='only these restaurants (default: all)')
+    parser.add_argument('--concurrency', type=int, default=PUBLISH_CONCURRENCY)
+    args = parser.parse_args(argv)
+    if not PUBLISH_DIR:
+        print('PUBLISH_DIR is not set', file=sys.stderr)
+        return 1
+
+    try:
+        if args.restaurant_ids:
+            restaurant_ids = [ObjectId(value) for value in args.restaurant_ids if ObjectId.is_valid(value)]
+        else:
+            restaurant_ids = [doc['_id'] async for doc in users_col.find({}, {'_id': 1})]
+        published = await publish_all(restaurant_ids, max(1, args.concurrency))
+    finally:
+        await close_client()
+
+    changed = sum(1 for result in published if result and result.changed)
+    missing = sum(1 for result in published if result is None)
+    print(f'Published {len(published) - missing} menus to {PUBLISH_DIR} ({changed} changed, {missing} not found)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
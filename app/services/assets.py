@@ -0,0 +1,67 @@
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from fastapi import Response, status
+from fastapi.responses import StreamingResponse
+
+from app.core.blobs import IMAGE_CONTENT_TYPES, BlobInfo, blob_backend, blob_digest_from_url, parse_data_url
+from app.core.http_cache import etag_matches, parse_byte_range
+
+
+async def load_asset(stored_url: str) -> Optional[Tuple[BlobInfo, Optional[bytes]]]:
+    # Legacy rows still hold data URLs until the blob migration has run; those bytes are served from memory.
+    parsed = parse_data_url(stored_url)
+    if parsed is not None:
+        content_type, data = parsed
+        return BlobInfo(hashlib.sha256(data).hexdigest(), content_type, len(data)), data
+
+    digest = blob_digest_from_url(stored_url)
+    info = await blob_backend.info(digest) if digest else None
+    return (info, None) if info else None
+
+
+def blob_response(
+    info: BlobInfo, data: Optional[bytes], headers: Dict[str, str], range_header: str = '', if_range: str = ''
+) -> Response:
+    headers = {**headers, 'Accept-Ranges': 'bytes', 'X-Content-Type-Options': 'nosniff'}
+    if info.content_type not in IMAGE_CONTENT_TYPES:
+        # Served from the API origin: anything but a raster image (legacy uploads, PDFs) runs without script access.
+        headers['Content-Security-Policy'] = 'sandbox'
+    byte_range = None
+    # If-Range needs a strong match; a stale validator gets the whole representation.
+    if range_header and (not if_range or if_range.strip() == headers.get('ETag')):
+        byte_range = parse_byte_range(range_header, info.length)
+
+    status_code, offset, length = status.HTTP_200_OK, 0, info.length
+    if byte_range is not None:
+        offset, end = byte_range
+        status_code, length = status.HTTP_206_PARTIAL_CONTENT, end - offset + 1
+        headers['Content-Range'] = f'bytes {offset}-{end}/{info.length}'
+    headers['Content-Length'] = str(length)
+
+    if data is not None:
+        return Response(data[offset:offset + length], status_code=status_code, media_type=info.content_type, headers=headers)
+    return StreamingResponse(
+        blob_backend.iter_chunks(info.digest, offset, length),
+        status_code=status_code,
+        media_type=info.content_type,
+        headers=headers,
+    )
+
+
+async def asset_response(
+    stored_url: str, cache_control: str, if_none_match: str = '', range_header: str = '', if_range: str = ''
+) -> Optional[Response]:
+    digest = blob_digest_from_url(stored_url)
+    headers = {'Cache-Control': cache_control} if cache_control else {}
+    if digest and etag_matches(if_none_match, f'"{digest}"'):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**headers, 'ETag': f'"{digest}"'})
+
+    asset = await load_asset(stored_url)
+    if asset is None:
+        return None
+    info, data = asset
+    headers['ETag'] = f'"{info.digest}"'
+    if etag_matches(if_none_match, headers['ETag']):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return blob_response(info, data, headers, range_header, if_range)
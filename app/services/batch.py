@@ -0,0 +1,241 @@
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.blobs import IMAGE_CONTENT_TYPES, check_data_url
+from app.core.database import categories_col, items_col
+from app.schemas.category import CategoryBatchRequest
+from app.schemas.item import MenuItemBatchRequest
+from app.services.categories import adopt_legacy_items_update, legacy_items_filter, normalize_category_name
+from app.services.media import ImageUploads
+from app.services.menu import CATEGORY_ITEMS_CHANGE, mark_menu_changed, menu_images
+from app.services.serializers import category_response, menu_item_response
+
+NOT_EXECUTED_DETAIL = 'Not executed because an earlier operation failed'
+DUPLICATE_KEY_ERROR = 11000
+
+# A validated operation: status, id, the image it carries and a builder taking the stored image URL.
+PlannedWrite = Tuple[int, ObjectId, str, Callable[[str], Tuple[Any, Optional[Dict[str, Any]]]]]
+PlanOperation = Callable[[int, Any], PlannedWrite]
+
+
+class BatchPlan:
+    def __init__(self, operations: Sequence[Any], ordered: bool):
+        self.operations = operations
+        self.ordered = ordered
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        self.writes: List[Any] = []
+        self.write_indexes: List[int] = []
+
+    async def build(self, plan_operation: PlanOperation, images: ImageUploads) -> None:
+        planned: List[Tuple[int, PlannedWrite]] = []
+        for index, operation in enumerate(self.operations):
+            try:
+                planned.append((index, plan_operation(index, operation)))
+            except HTTPException as exc:
+                self.results[index] = self._result(index, exc.status_code, detail=str(exc.detail))
+                if self.ordered:
+                    break
+        # Media is stored once planning is over, and only for the operations that passed validation.
+        for index, (status_code, op_id, image_url, build_write) in planned:
+            write, data = build_write(await images.store(image_url))
+            self.writes.append(write)
+            self.write_indexes.append(index)
+            self.results[index] = self._result(index, status_code, op_id=str(op_id), data=data)
+
+    async def execute(self, collection: Any, duplicate_detail: str) -> List[int]:
+        write_errors: Dict[int, Dict[str, Any]] = {}
+        if self.writes:
+            try:
+                await collection.bulk_write(self.writes, ordered=self.ordered)
+            except BulkWriteError as exc:
+                write_errors = {error['index']: error for error in exc.details.get('writeErrors', [])}
+
+        halted_at = min(write_errors) if self.ordered and write_errors else None
+        for position, index in enumerate(self.write_indexes):
+            error = write_errors.get(position)
+            if error is not None:
+                if error.get('code') == DUPLICATE_KEY_ERROR:
+                    self.results[index] = self._result(index, status.HTTP_409_CONFLICT, detail=duplicate_detail)
+                else:
+                    self.results[index] = self._result(
+                        index, status.HTTP_500_INTERNAL_SERVER_ERROR, detail=error.get('errmsg', 'Write failed')
+                    )
+            elif halted_at is not None and position > halted_at:
+                self.results[index] = None
+
+        succeeded: List[int] = []
+        for index, result in enumerate(self.results):
+            if result is None:
+                self.results[index] = self._result(index, status.HTTP_424_FAILED_DEPENDENCY, detail=NOT_EXECUTED_DETAIL)
+            elif result['status'] < 300:
+                succeeded.append(index)
+        return succeeded
+
+    def response(self, succeeded: List[int]) -> Dict[str, Any]:
+        ops = [self.operations[index].op for index in succeeded]
+        return {
+            'ordered': self.ordered,
+            'inserted': ops.count('create'),
+            'updated': ops.count('update'),
+            'deleted': ops.count('delete'),
+            'failed': len(self.operations) - len(succeeded),
+            'results': self.results,
+        }
+
+    def _result(self, index: int, status_code: int, op_id: str = '', detail: str = '', data: Optional[Dict[str, Any]] = None):
+        op_id = op_id or self.operations[index].id
+        return {'index': index, 'op': self.operations[index].op, 'status': status_code, 'id': op_id, 'detail': detail, 'data': data}
+
+
+def _object_id(value: str, detail: str) -> ObjectId:
+    if not ObjectId.is_valid(value):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return ObjectId(value)
+
+
+def _referenced_ids(operations: Sequence[Any]) -> List[ObjectId]:
+    return [ObjectId(operation.id) for operation in operations if operation.op != 'create' and ObjectId.is_valid(operation.id)]
+
+
+async def run_item_batch(restaurant_id: ObjectId, request: MenuItemBatchRequest) -> Dict[str, Any]:
+    categories_by_key = {
+        doc['name_key']: doc async for doc in categories_col.find({'restaurant_id': restaurant_id}, {'name': 1, 'name_key': 1})
+    }
+    existing: Set[ObjectId] = set()
+    referenced = _referenced_ids(request.operations)
+    if referenced:
+        existing = {
+            doc['_id'] async for doc in items_col.find({'_id': {'$in': referenced}, 'restaurant_id': restaurant_id}, {'_id': 1})
+        }
+    now = datetime.now(timezone.utc)
+    images = menu_images(restaurant_id)
+
+    def plan_item(index: int, operation: Any) -> PlannedWrite:
+        item_id = ObjectId() if operation.op == 'create' else _object_id(operation.id, 'Invalid item id')
+        if operation.op != 'create' and item_id not in existing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Item not found')
+        if operation.op == 'delete':
+            existing.discard(item_id)
+            write = DeleteOne({'_id': item_id, 'restaurant_id': restaurant_id})
+            return status.HTTP_204_NO_CONTENT, item_id, '', lambda _: (write, None)
+
+        payload = operation.data
+        category = categories_by_key.get(normalize_category_name(payload.category).lower())
+        if category is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Category not found. Please create category first.',
+            )
+        image_url = payload.image_url.strip()
+        check_data_url(image_url, IMAGE_CONTENT_TYPES)
+        fields = {
+            'name': payload.name.strip(),
+            'category_id': category['_id'],
+            'description': payload.description.strip(),
+            'price': round(payload.price, 2),
+        }
+        if operation.op == 'create':
+            existing.add(item_id)
+
+            def build_insert(stored_url: str) -> Tuple[Any, Dict[str, Any]]:
+                doc = {'_id': item_id, 'restaurant_id': restaurant_id, **fields, 'image_url': stored_url, 'created_at': now}
+                return InsertOne(doc), menu_item_response({**doc, 'category': category['name']})
+
+            return status.HTTP_201_CREATED, item_id, image_url, build_insert
+
+        def build_update(stored_url: str) -> Tuple[Any, Dict[str, Any]]:
+            update = {**fields, 'image_url': stored_url, 'updated_at': now}
+            doc = {'_id': item_id, 'restaurant_id': restaurant_id, **update, 'category': category['name']}
+            write = UpdateOne({'_id': item_id, 'restaurant_id': restaurant_id}, {'$set': update, '$unset': {'category': ''}})
+            return write, menu_item_response(doc)
+
+        return status.HTTP_200_OK, item_id, image_url, build_update
+
+    plan = BatchPlan(request.operations, request.ordered)
+    await plan.build(plan_item, images)
+    succeeded = await plan.execute(items_col, 'Item already exists')
+    if succeeded:
+        await mark_menu_changed(restaurant_id, [('item', ObjectId(plan.results[index]['id'])) for index in succeeded])
+        images.announce()
+    return plan.response(succeeded)
+
+
+async def run_category_batch(restaurant_id: ObjectId, request: CategoryBatchRequest) -> Dict[str, Any]:
+    current_names: Dict[ObjectId, str] = {}
+    referenced = _referenced_ids(request.operations)
+    if referenced:
+        current_names = {
+            doc['_id']: doc.get('name', '')
+            async for doc in categories_col.find({'_id': {'$in': referenced}, 'restaurant_id': restaurant_id}, {'name': 1})
+        }
+    now = datetime.now(timezone.utc)
+    images = menu_images(restaurant_id)
+    item_writes: Dict[int, List[Any]] = {}
+    # Renamed categories, whose items change along with them.
+    renamed: Set[int] = set()
+
+    def plan_category(index: int, operation: Any) -> PlannedWrite:
+        category_id = ObjectId() if operation.op == 'create' else _object_id(operation.id, 'Invalid category id')
+        if operation.op != 'create' and category_id not in current_names:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
+        if operation.op == 'delete':
+            name = current_names.pop(category_id)
+            item_writes[index] = [
+                DeleteMany(legacy_items_filter(restaurant_id, name)),
+                DeleteMany({'restaurant_id': restaurant_id, 'category_id': category_id}),
+            ]
+            write = DeleteOne({'_id': category_id, 'restaurant_id': restaurant_id})
+            return status.HTTP_204_NO_CONTENT, category_id, '', lambda _: (write, None)
+
+        payload = operation.data
+        normalized_name = normalize_category_name(payload.name)
+        if not normalized_name:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Category name cannot be empty')
+        image_url = payload.image_url.strip()
+        check_data_url(image_url, IMAGE_CONTENT_TYPES)
+        fields = {
+            'name': normalized_name,
+            'name_key': normalized_name.lower(),
+            'description': payload.description.strip(),
+        }
+        if operation.op == 'create':
+            current_names[category_id] = normalized_name
+
+            def build_insert(stored_url: str) -> Tuple[Any, Dict[str, Any]]:
+                doc = {'_id': category_id, 'restaurant_id': restaurant_id, **fields, 'image_url': stored_url, 'created_at': now}
+                return InsertOne(doc), category_response(doc)
+
+            return status.HTTP_201_CREATED, category_id, image_url, build_insert
+
+        previous_name = current_names[category_id]
+        if previous_name != normalized_name:
+            renamed.add(index)
+            item_writes[index] = [
+                UpdateMany(legacy_items_filter(restaurant_id, previous_name), adopt_legacy_items_update(category_id))
+            ]
+        current_names[category_id] = normalized_name
+
+        def build_update(stored_url: str) -> Tuple[Any, Dict[str, Any]]:
+            update = {**fields, 'image_url': stored_url, 'updated_at': now}
+            write = UpdateOne({'_id': category_id, 'restaurant_id': restaurant_id}, {'$set': update})
+            return write, category_response({'_id': category_id, 'restaurant_id': restaurant_id, **update})
+
+        return status.HTTP_200_OK, category_id, image_url, build_update
+
+    plan = BatchPlan(request.operations, request.ordered)
+    await plan.build(plan_category, images)
+    succeeded = await plan.execute(categories_col, 'Category already exists')
+    changes = [('category', ObjectId(plan.results[index]['id'])) for index in succeeded]
+    changes += [(CATEGORY_ITEMS_CHANGE, ObjectId(plan.results[index]['id'])) for index in succeeded if index in renamed]
+    cascades = [write for index in succeeded for write in item_writes.get(index, [])]
+    if cascades:
+        await items_col.bulk_write(cascades, ordered=True)
+    if succeeded:
+        await mark_menu_changed(restaurant_id, changes)
+        images.announce()
+    return plan.response(succeeded)
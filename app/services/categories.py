@@ -1,22 +1,44 @@
 import re
+from typing import Any, Dict
 
 from bson import ObjectId
 from fastapi import HTTPException, status
 
-from app.core.database import categories_col
+from app.core.database import categories_col, items_col
 
 
 def normalize_category_name(name: str) -> str:
     return re.sub(r'\s+', ' ', name).strip()
 
 
-def require_existing_category(restaurant_id: ObjectId, category_name: str) -> str:
+async def require_existing_category(restaurant_id: ObjectId, category_name: str) -> Dict[str, Any]:
     normalized_name = normalize_category_name(category_name)
     name_key = normalized_name.lower()
-    existing = categories_col.find_one({'restaurant_id': restaurant_id, 'name_key': name_key})
+    existing = await categories_col.find_one({'restaurant_id': restaurant_id, 'name_key': name_key}, {'name': 1})
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Category not found. Please create category first.',
         )
-    return existing['name']
+    return existing
+
+
+def legacy_items_filter(restaurant_id: ObjectId, category_name: str) -> Dict[str, Any]:
+    return {'restaurant_id': restaurant_id, 'category_id': {'$exists': False}, 'category': category_name}
+
+
+def category_items_filter(restaurant_id: ObjectId, category_id: ObjectId, category_name: str) -> Dict[str, Any]:
+    return {'$or': [{'restaurant_id': restaurant_id, 'category_id': category_id}, legacy_items_filter(restaurant_id, category_name)]}
+
+
+def adopt_legacy_items_update(category_id: ObjectId) -> Dict[str, Any]:
+    return {'$set': {'category_id': category_id}, '$unset': {'category': ''}}
+
+
+async def adopt_legacy_items(restaurant_id: ObjectId, category_id: ObjectId, category_name: str) -> int:
+    # Items written before category ids existed only carry the name; pin them to the id
+    # before the name changes or the category goes away.
+    result = await items_col.update_many(
+        legacy_items_filter(restaurant_id, category_name), adopt_legacy_items_update(category_id)
+    )
+    return result.modified_count
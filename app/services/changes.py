@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.database import categories_col
+from app.services.items import list_items_in_menu_order, load_category_order
+from app.services.media import variants_for_urls
+from app.services.menu import (
+    CATEGORY_ITEMS_CHANGE,
+    FULL_MENU_CHANGE,
+    menu_version,
+    public_category_fields,
+    public_menu_header,
+    public_menu_item,
+    selected_public_template,
+)
+from app.services.projections import ITEM_FIELDS, mongo_projection
+
+HEADER_CHANGE_KINDS = {'template', 'restaurant', 'image'}
+
+
+def changes_since(restaurant: Dict[str, Any], since: int) -> Optional[List[Dict[str, Any]]]:
+    # None when the history no longer reaches back to `since` (or never covered it).
+    version = menu_version(restaurant)
+    history = restaurant.get('menu_changes', [])
+    if since > version or since < version - len(history):
+        return None
+    entries = [entry for changes in history[len(history) - (version - since):] for entry in changes]
+    if any(entry['kind'] == FULL_MENU_CHANGE for entry in entries):
+        return None
+    return entries
+
+
+async def build_menu_changes(restaurant: Dict[str, Any], since: int) -> Dict[str, Any]:
+    restaurant_id = restaurant['_id']
+    delta: Dict[str, Any] = {'restaurant_id': str(restaurant_id), 'since': since, 'seq': menu_version(restaurant)}
+    entries = changes_since(restaurant, since)
+    if entries is None:
+        # The client reloads the full menu, then continues from `seq`; replaying a change twice is harmless.
+        return {**delta, 'reset': True}
+
+    ids: Dict[str, Set[Any]] = {}
+    for entry in entries:
+        ids.setdefault(entry['kind'], set()).add(entry.get('id'))
+    item_ids, category_ids, image_urls = ids.get('item', set()), ids.get('category', set()), list(ids.get('image', ()))
+    item_category_ids = list(ids.get(CATEGORY_ITEMS_CHANGE, ()))
+
+    # History names what was touched, not its content: everything is read fresh and missing ids become tombstones.
+    category_docs: List[Dict[str, Any]] = []
+    if category_ids or image_urls:
+        category_query = {
+            'restaurant_id': restaurant_id,
+            '$or': [{'_id': {'$in': list(category_ids)}}, {'image_url': {'$in': image_urls}}],
+        }
+        category_docs = await (
+            categories_col.find(category_query, {'name': 1, 'description': 1, 'image_url': 1})
+            .sort([('name', 1), ('_id', 1)])
+            .to_list()
+        )
+    item_docs: List[Dict[str, Any]] = []
+    if item_ids or image_urls or item_category_ids:
+        item_query = {
+            'restaurant_id': restaurant_id,
+            '$or': [
+                {'_id': {'$in': list(item_ids)}},
+                {'image_url': {'$in': image_urls}},
+                {'category_id': {'$in': item_category_ids}},
+            ],
+        }
+        item_docs = await list_items_in_menu_order(
+            item_query, mongo_projection(ITEM_FIELDS), await load_category_order(restaurant_id)
+        )
+
+    template = None
+    if ids.keys() & HEADER_CHANGE_KINDS:
+        template = await selected_public_template(restaurant)
+    variants_by_digest = await variants_for_urls(
+        [doc.get('image_url', '') for doc in category_docs + item_docs] + [template.get('asset_url', '') if template else '']
+    )
+
+    found_categories = {doc['_id'] for doc in category_docs}
+    found_items = {doc['_id'] for doc in item_docs}
+    return {
+        **delta,
+        'reset': False,
+        'restaurant': public_menu_header(restaurant, template, variants_by_digest) if template else None,
+        'categories': [
+            {'id': str(doc['_id']), 'name': doc['name'], **public_category_fields(doc, variants_by_digest)}
+            for doc in category_docs
+        ],
+        'items': [public_menu_item(doc, variants_by_digest) for doc in item_docs],
+        'deleted': {
+            'categories': sorted(str(category_id) for category_id in category_ids - found_categories),
+            'items': sorted(str(item_id) for item_id in item_ids - found_items),
+        },
+    }
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+import orjson
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.core.config import (
+    MENU_EVENTS_HEARTBEAT_SECONDS,
+    MENU_EVENTS_MAX_STREAM_SECONDS,
+    MENU_EVENTS_POLL_SECONDS,
+    MENU_EVENTS_QUEUE_SIZE,
+)
+from app.core.database import users_col
+from app.core.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+RETRY_MILLISECONDS = 5000
+HEARTBEAT = b': keep-alive\n\n'
+# Only the version bump matters; the menu_changes array would make every event as large as the history.
+CHANGE_STREAM_PIPELINE = [
+    {'$match': {'operationType': 'update', 'updateDescription.updatedFields.menu_version': {'$exists': True}}},
+    {'$project': {'documentKey': 1, 'updateDescription.updatedFields.menu_version': 1}},
+]
+
+menu_event_subscribers = Gauge('menu_event_subscribers', 'Open menu event streams.')
+menu_event_subscribers_dropped_total = Counter(
+    'menu_event_subscribers_dropped_total', 'Menu event streams closed because the client fell behind.'
+)
+
+
+class Subscription:
+    def __init__(self, restaurant_id: ObjectId) -> None:
+        self.restaurant_id = restaurant_id
+        self.queue: asyncio.Queue = asyncio.Queue(MENU_EVENTS_QUEUE_SIZE)
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+        if self.queue.empty():
+            self.queue.put_nowait(None)
+
+
+class MenuEventHub:
+    def __init__(self) -> None:
+        self._subscribers: Dict[ObjectId, Set[Subscription]] = {}
+        self._versions: Dict[ObjectId, int] = {}
+        # Restaurants followed without an open stream (e.g. a cached menu), with how many hold each.
+        self._followed: Dict[ObjectId, int] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        # Told about every version seen, including writes served by other workers.
+        self.version_listeners: List[Callable[[ObjectId, int], None]] = []
+
+    def restaurant_ids(self) -> List[ObjectId]:
+        return list(self._followed.keys() | self._subscribers.keys())
+
+    def _start_watcher(self) -> None:
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(_watch_menu_versions(self))
+
+    def _stop_watcher_if_idle(self) -> None:
+        if not self._subscribers and not self._followed and self._watcher is not None:
+            # Nobody is listening; the next subscribe or follow starts a fresh watcher.
+            self._watcher.cancel()
+            self._watcher = None
+
+    def follow(self, restaurant_id: ObjectId) -> None:
+        self._followed[restaurant_id] = self._followed.get(restaurant_id, 0) + 1
+        self._start_watcher()
+
+    def unfollow(self, restaurant_id: ObjectId) -> None:
+        count = self._followed.pop(restaurant_id, 0) - 1
+        if count > 0:
+            self._followed[restaurant_id] = count
+        self._stop_watcher_if_idle()
+
+    def subscribe(self, restaurant_id: ObjectId) -> Subscription:
+        self._start_watcher()
+        subscription = Subscription(restaurant_id)
+        self._subscribers.setdefault(restaurant_id, set()).add(subscription)
+        menu_event_subscribers.labels().inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.restaurant_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        menu_event_subscribers.labels().dec()
+        if not subscribers:
+            del self._subscribers[subscription.restaurant_id]
+            self._versions.pop(subscription.restaurant_id, None)
+        self._stop_watcher_if_idle()
+
+    def publish(self, restaurant_id: ObjectId, version: int) -> None:
+        for listener in self.version_listeners:
+            listener(restaurant_id, version)
+        # Local writes, the change stream and the poller may all report one version; it is delivered once.
+        subscribers = self._subscribers.get(restaurant_id)
+        if not subscribers or version <= self._versions.get(restaurant_id, 0):
+            return
+        self._versions[restaurant_id] = version
+        for subscription in list(subscribers):
+            try:
+                subscription.queue.put_nowait(version)
+            except asyncio.QueueFull:
+                # A client that cannot keep up is cut loose; it reconnects and catches up through /changes.
+                menu_event_subscribers_dropped_total.labels().inc()
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    async def close(self) -> None:
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                self.unsubscribe(subscription)
+                subscription.close()
+        self._followed.clear()
+        if self._watcher is not None:
+            watcher, self._watcher = self._watcher, None
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+
+
+async def _publish_current_versions(hub: MenuEventHub) -> None:
+    restaurant_ids = hub.restaurant_ids()
+    if restaurant_ids:
+        async for doc in users_col.find({'_id': {'$in': restaurant_ids}}, {'menu_version': 1}):
+            hub.publish(doc['_id'], int(doc.get('menu_version', 0)))
+
+
+async def _poll_menu_versions(hub: MenuEventHub) -> None:
+    while True:
+        await asyncio.sleep(MENU_EVENTS_POLL_SECONDS)
+        try:
+            await _publish_current_versions(hub)
+        except Exception:
+            logger.exception('Polling menu versions failed')
+
+
+async def _watch_menu_versions(hub: MenuEventHub) -> None:
+    # Writes served by other workers arrive through a change stream, or by polling where there is none.
+    while True:
+        try:
+            async with await users_col.watch(CHANGE_STREAM_PIPELINE) as stream:
+                # Writes from before the stream opened (or while it was down) are caught up once.
+                await _publish_current_versions(hub)
+                async for change in stream:
+                    hub.publish(change['documentKey']['_id'], change['updateDescription']['updatedFields']['menu_version'])
+        except OperationFailure as exc:
+            logger.info('Change streams unavailable (%s); polling menu versions instead', exc)
+            await _poll_menu_versions(hub)
+        except Exception:
+            logger.exception('Menu change stream failed')
+            await asyncio.sleep(MENU_EVENTS_POLL_SECONDS)
+
+
+def menu_event(restaurant_id: ObjectId, version: int) -> bytes:
+    data = orjson.dumps({'restaurant_id': str(restaurant_id), 'seq': version})
+    return b'id: %d\nevent: menu\ndata: %s\n\n' % (version, data)
+
+
+async def menu_event_stream(subscription: Subscription, version: int, last_event_id: str = '') -> AsyncIterator[bytes]:
+    # Each event carries the menu version; clients fetch /changes?since=<their seq> to apply it.
+    try:
+        yield b'retry: %d\n\n' % RETRY_MILLISECONDS
+        if last_event_id != str(version):
+            yield menu_event(subscription.restaurant_id, version)
+        sent = version
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + MENU_EVENTS_MAX_STREAM_SECONDS
+        while not subscription.closed:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                version = await asyncio.wait_for(subscription.queue.get(), min(remaining, MENU_EVENTS_HEARTBEAT_SECONDS))
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            if version is None:
+                break
+            if version > sent:
+                sent = version
+                yield menu_event(subscription.restaurant_id, version)
+    finally:
+        menu_events.unsubscribe(subscription)
+
+
+menu_events = MenuEventHub()
@@ -0,0 +1,151 @@
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+from app.core.database import categories_col, items_col
+from app.services.pagination import decode_cursor, encode_cursor, keyset_filter
+
+# Items are listed by category name, then item name; the cursor carries the category's
+# name and id so a page can resume even if that category was deleted in between.
+ITEM_CURSOR_KEYS = ('category', 'category_id', 'name', '_id')
+ITEM_WITHIN_CATEGORY_KEYS = ('name', '_id')
+
+CategoryOrder = List[Tuple[str, ObjectId]]
+
+
+async def load_category_order(restaurant_id: ObjectId) -> CategoryOrder:
+    cursor = categories_col.find({'restaurant_id': restaurant_id}, {'name': 1}).sort([('name', 1), ('_id', 1)])
+    return [(doc['name'], doc['_id']) async for doc in cursor]
+
+
+def with_category_name(item_doc: Dict[str, Any], names_by_id: Dict[ObjectId, str]) -> Dict[str, Any]:
+    # Items written before category ids existed only carry the name; the backfill script adopts them.
+    item_doc['category'] = names_by_id.get(item_doc.get('category_id')) or item_doc.get('category', '')
+    return item_doc
+
+
+async def item_with_category_name(item_doc: Dict[str, Any]) -> Dict[str, Any]:
+    category = None
+    if item_doc.get('category_id') is not None:
+        category = await categories_col.find_one({'_id': item_doc['category_id']}, {'name': 1})
+    return with_category_name(item_doc, {category['_id']: category['name']} if category else {})
+
+
+def menu_rank(order: CategoryOrder) -> Callable[[Dict[str, Any]], int]:
+    # An item's position is its category's; legacy items go by category name, orphans come last.
+    rank = {category_id: position for position, (_, category_id) in enumerate(order)}
+    rank_by_name = {name: position for position, (name, _) in enumerate(order)}
+    return lambda doc: rank.get(doc.get('category_id'), rank_by_name.get(doc.get('category', ''), len(order)))
+
+
+async def list_items_in_menu_order(
+    query: Dict[str, Any], projection: Optional[Dict[str, int]], order: CategoryOrder
+) -> List[Dict[str, Any]]:
+    names_by_id = dict((category_id, name) for name, category_id in order)
+    rank_of = menu_rank(order)
+    if projection is not None:
+        projection = {**projection, 'category_id': 1, 'category': 1, 'name': 1}
+
+    docs = [with_category_name(doc, names_by_id) async for doc in items_col.find(query, projection)]
+    docs.sort(key=lambda doc: (rank_of(doc), doc['name'], doc['_id']))
+    return docs
+
+
+async def _bucket_counts(restaurant_id: ObjectId, order: CategoryOrder) -> Tuple[List[int], Set[int]]:
+    # Item counts per position in the menu (the last one holds orphans), and the positions holding legacy items.
+    known_ids = {category_id for _, category_id in order}
+    rank_of = menu_rank(order)
+    counts = [0] * (len(order) + 1)
+    legacy: Set[int] = set()
+    pipeline = [
+        {'$match': {'restaurant_id': restaurant_id}},
+        {'$group': {'_id': {'category_id': '$category_id', 'category': '$category'}, 'count': {'$sum': 1}}},
+    ]
+    async for group in items_col.aggregate(pipeline):
+        position = rank_of(group['_id'])
+        counts[position] += group['count']
+        if group['_id'].get('category_id') not in known_ids:
+            legacy.add(position)
+    return counts, legacy
+
+
+def _bucket_filter(order: CategoryOrder, position: int, legacy: Set[int]) -> Dict[str, Any]:
+    known_ids = [category_id for _, category_id in order]
+    if position == len(order):
+        return {'category_id': {'$nin': known_ids}, 'category': {'$nin': [name for name, _ in order]}}
+    name, category_id = order[position]
+    if position not in legacy:
+        return {'category_id': category_id}
+    return {'$or': [{'category_id': category_id}, {'category_id': {'$nin': known_ids}, 'category': name}]}
+
+
+def _cursor_position(order: CategoryOrder, cursor: str) -> Tuple[int, Optional[List[Any]]]:
+    category_name, category_id, item_name, item_id = decode_cursor(cursor, ITEM_CURSOR_KEYS)
+    if not all(isinstance(value, str) for value in (category_name, item_name)) or not isinstance(category_id, (ObjectId, str)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+    if not category_name and not category_id:
+        return len(order), [item_name, item_id]
+    for position, (_, known_id) in enumerate(order):
+        if known_id == category_id:
+            return position, [item_name, item_id]
+    # The cursor's category is gone; resume at the category that now sorts after it.
+    return bisect_left([name for name, _ in order], category_name), None
+
+
+def _page_cursor(doc: Dict[str, Any], position: int, order: CategoryOrder) -> str:
+    # The cursor names the category the item is listed under, which for legacy items is not their own field.
+    category_name, category_id = order[position] if position < len(order) else ('', '')
+    return encode_cursor({**doc, 'category': category_name, 'category_id': category_id}, ITEM_CURSOR_KEYS)
+
+
+async def fetch_items_page(
+    restaurant_id: ObjectId,
+    projection: Optional[Dict[str, int]],
+    order: CategoryOrder,
+    limit: int,
+    cursor: str = '',
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    names_by_id = dict((category_id, name) for name, category_id in order)
+    rank_of = menu_rank(order)
+    if projection is not None:
+        projection = {**projection, 'category_id': 1, 'category': 1, 'name': 1}
+
+    position, after = _cursor_position(order, cursor) if cursor else (0, None)
+    counts, legacy = await _bucket_counts(restaurant_id, order)
+
+    def bucket_query(bucket: int) -> Dict[str, Any]:
+        query = _bucket_filter(order, bucket, legacy)
+        if after is not None and bucket == position:
+            query = {'$and': [query, keyset_filter(ITEM_WITHIN_CATEGORY_KEYS, after)]}
+        return query
+
+    # Categories that fit whole on the page are read in one query and ordered here; the category the
+    # page ends in is one range scan over (restaurant_id, category_id, name, _id). Empty ones are skipped.
+    docs: List[Dict[str, Any]] = []
+    while position <= len(order) and len(docs) <= limit:
+        remaining = limit + 1 - len(docs)
+        whole: List[int] = []
+        end, size = position, 0
+        while end <= len(order) and size + counts[end] <= remaining:
+            if counts[end]:
+                whole.append(end)
+            size += counts[end]
+            end += 1
+        if whole:
+            query = {'restaurant_id': restaurant_id, '$or': [bucket_query(bucket) for bucket in whole]}
+            page = [with_category_name(doc, names_by_id) async for doc in items_col.find(query, projection)]
+            page.sort(key=lambda doc: (rank_of(doc), doc['name'], doc['_id']))
+            docs.extend(page)
+        elif end <= len(order):
+            query = {'restaurant_id': restaurant_id, **bucket_query(end)}
+            page = items_col.find(query, projection).sort([(key, 1) for key in ITEM_WITHIN_CATEGORY_KEYS]).limit(remaining)
+            docs.extend([with_category_name(doc, names_by_id) async for doc in page])
+            end += 1
+        position, after = end, None
+
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, _page_cursor(docs[-1], rank_of(docs[-1]), order)
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.core.blobs import (
+    IMAGE_CONTENT_TYPES,
+    blob_digest_from_url,
+    blob_path,
+    externalize_data_url,
+    parse_data_url,
+    require_content_type,
+    resolve_blob_url,
+    store_blob,
+)
+from app.core.config import IMAGE_VARIANT_QUEUE_SIZE, PUBLIC_MENU_IMAGE_WIDTH
+from app.core.database import LazyCollection
+from app.core.images import RESIZABLE_CONTENT_TYPES, VARIANT_FORMATS, render_variants_in_pool
+
+logger = logging.getLogger(__name__)
+
+variants_col = LazyCollection('blob_variants')
+
+_variant_slots: Optional[asyncio.Semaphore] = None
+# Renders queued or running, by source digest; the same image uploaded again joins the render in flight.
+_pending_renders: Dict[str, 'asyncio.Task[bool]'] = {}
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _get_variant_slots() -> asyncio.Semaphore:
+    global _variant_slots
+    if _variant_slots is None:
+        _variant_slots = asyncio.Semaphore(IMAGE_VARIANT_QUEUE_SIZE)
+    return _variant_slots
+
+
+def _spawn(coro: Awaitable[Any]) -> None:
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def save_variants(digest: str, rendered: List[Tuple[int, int, str, bytes]]) -> List[Dict[str, Any]]:
+    variants = []
+    for width, height, fmt, data in rendered:
+        variants.append(
+            {
+                'width': width,
+                'height': height,
+                'format': fmt,
+                'digest': await store_blob(data, VARIANT_FORMATS[fmt]),
+                'length': len(data),
+            }
+        )
+    await variants_col.update_one(
+        {'_id': digest},
+        {'$set': {'variants': variants, 'created_at': datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return variants
+
+
+async def _render_and_store_variants(digest: str, data: bytes) -> bool:
+    try:
+        return bool(await save_variants(digest, await render_variants_in_pool(data)))
+    except Exception:
+        logger.exception('Rendering image variants failed for blob %s', digest)
+        return False
+
+
+async def _queue_variants(digest: str, data: bytes) -> 'asyncio.Task[bool]':
+    # Each queued render holds the decoded upload, so past IMAGE_VARIANT_QUEUE_SIZE the upload waits for a slot.
+    slots = _get_variant_slots()
+    await slots.acquire()
+    render = _pending_renders.get(digest)
+    if render is not None:
+        slots.release()
+        return render
+    render = asyncio.create_task(_render_and_store_variants(digest, data))
+    _pending_renders[digest] = render
+
+    def finished(_: asyncio.Task) -> None:
+        _pending_renders.pop(digest, None)
+        slots.release()
+
+    render.add_done_callback(finished)
+    return render
+
+
+class ImageUploads:
+    # Images stored for one write (a single request, a batch or an import). Their variants render in the
+    # background and are announced together, so the menu changes once rather than once per image.
+    def __init__(self, on_variants_ready: Callable[[List[str]], Awaitable[Any]]) -> None:
+        self.on_variants_ready = on_variants_ready
+        self._renders: Dict[str, 'asyncio.Task[bool]'] = {}
+
+    async def store(self, value: str, allowed_types: FrozenSet[str] = IMAGE_CONTENT_TYPES) -> str:
+        parsed = parse_data_url(value)
+        if parsed is None:
+            return await externalize_data_url(value, allowed_types)
+
+        content_type, data = parsed
+        require_content_type(content_type, allowed_types)
+        digest = await store_blob(data, content_type)
+        if content_type in RESIZABLE_CONTENT_TYPES and digest not in self._renders:
+            render = _pending_renders.get(digest)
+            if render is None and not await variants_col.find_one({'_id': digest}, {'_id': 1}):
+                render = await _queue_variants(digest, data)
+            if render is not None:
+                self._renders[digest] = render
+        return blob_path(digest)
+
+    def announce(self) -> None:
+        # Call once the write referencing the images has succeeded.
+        if self._renders:
+            renders, self._renders = self._renders, {}
+            _spawn(self._announce(renders))
+
+    async def _announce(self, renders: Dict[str, 'asyncio.Task[bool]']) -> None:
+        done = await asyncio.gather(*renders.values(), return_exceptions=True)
+        urls = [blob_path(digest) for digest, ok in zip(renders, done) if ok is True]
+        if not urls:
+            return
+        try:
+            await self.on_variants_ready(urls)
+        except Exception:
+            logger.exception('Announcing image variants failed')
+
+
+async def variants_for_urls(urls: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    digests = {digest for digest in (blob_digest_from_url(url) for url in urls if url) if digest}
+    if not digests:
+        return {}
+    cursor = variants_col.find({'_id': {'$in': list(digests)}})
+    return {doc['_id']: doc.get('variants', []) async for doc in cursor}
+
+
+def pick_variant(
+    url: str, variants_by_digest: Dict[str, List[Dict[str, Any]]], width: int = PUBLIC_MENU_IMAGE_WIDTH
+) -> Optional[Dict[str, Any]]:
+    digest = blob_digest_from_url(url)
+    candidates = [variant for variant in variants_by_digest.get(digest or '', []) if variant['format'] == 'webp']
+    if not candidates:
+        return None
+    candidates.sort(key=lambda variant: variant['width'])
+    for variant in candidates:
+        if variant['width'] >= width:
+            return variant
+    return candidates[-1]
+
+
+def public_image_fields(
+    url: str, variants_by_digest: Dict[str, List[Dict[str, Any]]], width: int = PUBLIC_MENU_IMAGE_WIDTH
+) -> Dict[str, Any]:
+    variants = variants_by_digest.get(blob_digest_from_url(url) or '', [])
+    chosen = pick_variant(url, variants_by_digest, width)
+    return {
+        'image_url': resolve_blob_url(blob_path(chosen['digest']) if chosen else url),
+        'image_variants': [
+            {
+                'width': variant['width'],
+                'height': variant['height'],
+                'format': variant['format'],
+                'url': resolve_blob_url(blob_path(variant['digest'])),
+            }
+            for variant in variants
+        ],
+    }
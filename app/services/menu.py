@@ -0,0 +1,341 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import orjson
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.cache import ByteLRUCache
+from app.core.compression import precompress
+from app.core.config import MENU_CHANGE_LOG_SIZE, MENU_CHANGE_MAX_ENTRIES, PUBLIC_MENU_CACHE_MAX_BYTES
+from app.core.database import categories_col, published_menus_col, users_col
+from app.core.http_cache import make_etag
+from app.services.events import menu_events
+from app.services.items import list_items_in_menu_order
+from app.services.media import ImageUploads, public_image_fields, variants_for_urls
+from app.services.pagination import CATEGORY_SORT_KEYS, fetch_page
+from app.services.projections import ITEM_FIELDS, PUBLIC_RESTAURANT_PROJECTION, mongo_projection
+from app.services.serializers import menu_item_response
+from app.services.templates import builtin_templates, find_template_for_restaurant, public_template_asset_url
+
+logger = logging.getLogger(__name__)
+
+# Cached menus are followed through the event hub, which reports writes served by other workers.
+public_menu_cache = ByteLRUCache(PUBLIC_MENU_CACHE_MAX_BYTES, on_remove=menu_events.unfollow)
+TEMPLATE_IMAGE_WIDTH = 1080
+# Headroom under MongoDB's 16MB document limit for the other published_menus fields. Larger menus
+# keep only their version there and are built by each worker once per version.
+PUBLISHED_MENU_MAX_BYTES = 15 * 1024 * 1024
+# Notified after every menu write; the app registers the static publisher here when it is enabled.
+menu_change_listeners: List[Callable[[ObjectId], None]] = []
+# (kind, id) of an entity a write touched: 'item', 'category', 'template', 'restaurant', 'image' (by stored URL)
+# or 'category_items' (every item of a category, by its id).
+MenuChange = Tuple[str, Any]
+FULL_MENU_CHANGE = 'menu'
+CATEGORY_ITEMS_CHANGE = 'category_items'
+
+# The rebuild pass in flight per restaurant, and the restaurants written to since it started.
+_menu_rebuilds: Dict[ObjectId, asyncio.Task] = {}
+_stale_menus: Set[ObjectId] = set()
+
+
+class MenuSnapshot(NamedTuple):
+    version: int
+    etag: str
+    payload: bytes
+    # Content-coded variants of payload, filled lazily and dropped with the snapshot.
+    encoded: Dict[str, bytes]
+
+    @property
+    def size(self) -> int:
+        return len(self.payload) + sum(len(body) for body in self.encoded.values())
+
+
+def menu_version(restaurant: Dict[str, Any]) -> int:
+    return int(restaurant.get('menu_version', 0))
+
+
+async def current_menu_version(restaurant_id: ObjectId) -> int:
+    # Read fresh rather than from the cached principal so ETags never lag behind a write on another worker.
+    restaurant = await users_col.find_one({'_id': restaurant_id}, {'menu_version': 1})
+    return menu_version(restaurant or {})
+
+
+def menu_etag(restaurant_id: ObjectId, version: int, *variant: Any) -> str:
+    return make_etag(str(restaurant_id), version, *variant)
+
+
+async def selected_public_template(restaurant: Dict[str, Any]) -> Dict[str, Any]:
+    selected_template = await find_template_for_restaurant(restaurant['_id'], restaurant.get('template_id', 'classic-blue'))
+    return selected_template or builtin_templates()[0]
+
+
+def public_menu_header(
+    restaurant: Dict[str, Any], template: Dict[str, Any], variants_by_digest: Dict[str, List[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    template_asset_url = public_template_asset_url(restaurant['_id'], template)
+    if template.get('asset_type') == 'image':
+        template_asset_url = public_image_fields(template_asset_url, variants_by_digest, TEMPLATE_IMAGE_WIDTH)['image_url']
+    return {
+        'restaurant_id': str(restaurant['_id']),
+        'restaurant_name': restaurant['restaurant_name'],
+        'template_id': template['id'],
+        'template_style_id': template['style_id'],
+        'template_asset_url': template_asset_url,
+        'template_asset_type': template.get('asset_type', ''),
+    }
+
+
+def public_category_fields(category_doc: Dict[str, Any], variants_by_digest: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    return {
+        'description': category_doc.get('description', ''),
+        **public_image_fields(category_doc.get('image_url', ''), variants_by_digest),
+    }
+
+
+def public_menu_item(item_doc: Dict[str, Any], variants_by_digest: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    item = menu_item_response(item_doc)
+    item.update(public_image_fields(item_doc.get('image_url', ''), variants_by_digest))
+    return item
+
+
+async def build_public_menu(restaurant: Dict[str, Any], limit: Optional[int] = None, cursor: str = '') -> Dict[str, Any]:
+    selected_template = await selected_public_template(restaurant)
+
+    category_query = {'restaurant_id': restaurant['_id']}
+    category_projection = {'name': 1, 'description': 1, 'image_url': 1}
+    item_query: Dict[str, Any] = {'restaurant_id': restaurant['_id']}
+    next_cursor = None
+    if limit is None:
+        category_docs = await (
+            categories_col.find(category_query, category_projection)
+            .sort([(key, 1) for key in CATEGORY_SORT_KEYS])
+            .to_list()
+        )
+    else:
+        category_docs, next_cursor = await fetch_page(
+            categories_col, category_query, category_projection, CATEGORY_SORT_KEYS, limit, cursor
+        )
+        item_query['$or'] = [
+            {'category_id': {'$in': [doc['_id'] for doc in category_docs]}},
+            {'category_id': {'$exists': False}, 'category': {'$in': [doc['name'] for doc in category_docs]}},
+        ]
+    order = [(doc['name'], doc['_id']) for doc in category_docs]
+    item_docs = await list_items_in_menu_order(item_query, mongo_projection(ITEM_FIELDS), order)
+    variants_by_digest = await variants_for_urls(
+        [doc.get('image_url', '') for doc in category_docs + item_docs] + [selected_template.get('asset_url', '')]
+    )
+
+    category_meta = {doc['name']: public_category_fields(doc, variants_by_digest) for doc in category_docs}
+    categories: Dict[str, List[Dict[str, Any]]] = {}
+    for item_doc in item_docs:
+        item = public_menu_item(item_doc, variants_by_digest)
+        categories.setdefault(item['category'], []).append(item)
+
+    menu = {
+        **public_menu_header(restaurant, selected_template, variants_by_digest),
+        'category_meta': category_meta,
+        'categories': categories,
+    }
+    if limit is not None:
+        menu['next_cursor'] = next_cursor
+    return menu
+
+
+def public_menu_payload(menu: Dict[str, Any]) -> bytes:
+    return orjson.dumps(menu)
+
+
+def menu_snapshot(restaurant_id: ObjectId, version: int, payload: bytes) -> MenuSnapshot:
+    return MenuSnapshot(version=version, etag=menu_etag(restaurant_id, version, 'public_menu'), payload=payload, encoded={})
+
+
+async def rebuild_published_menu(restaurant_id: ObjectId) -> Optional[MenuSnapshot]:
+    restaurant = await users_col.find_one({'_id': restaurant_id}, PUBLIC_RESTAURANT_PROJECTION)
+    if not restaurant:
+        return None
+    version = menu_version(restaurant)
+    payload = public_menu_payload(await build_public_menu(restaurant))
+    update: Dict[str, Any] = {'$set': {'version': version, 'built_at': datetime.now(timezone.utc)}}
+    if len(payload) <= PUBLISHED_MENU_MAX_BYTES:
+        update['$set']['payload'] = payload
+    else:
+        # The previous payload must not outlive this version; readers build menus without one themselves.
+        update['$unset'] = {'payload': ''}
+    try:
+        await published_menus_col.update_one({'_id': restaurant_id, 'version': {'$lte': version}}, update, upsert=True)
+    except DuplicateKeyError:
+        pass  # A build of a newer version already landed.
+    return menu_snapshot(restaurant_id, version, payload)
+
+
+def _start_rebuild_pass(restaurant_id: ObjectId) -> None:
+    _stale_menus.discard(restaurant_id)
+    task = asyncio.create_task(rebuild_published_menu(restaurant_id))
+    _menu_rebuilds[restaurant_id] = task
+    task.add_done_callback(lambda done: _finish_rebuild_pass(restaurant_id, done))
+
+
+def _finish_rebuild_pass(restaurant_id: ObjectId, task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error('Rebuilding the published menu of restaurant %s failed', restaurant_id, exc_info=task.exception())
+    if restaurant_id in _stale_menus:
+        _start_rebuild_pass(restaurant_id)
+    else:
+        _menu_rebuilds.pop(restaurant_id, None)
+
+
+def schedule_menu_rebuild(restaurant_id: ObjectId) -> None:
+    # Writes landing during a rebuild are folded into one more pass instead of queueing a build each.
+    _stale_menus.add(restaurant_id)
+    if restaurant_id not in _menu_rebuilds:
+        _start_rebuild_pass(restaurant_id)
+
+
+async def flush_menu_rebuilds() -> None:
+    while _menu_rebuilds:
+        await asyncio.gather(*list(_menu_rebuilds.values()), return_exceptions=True)
+
+
+async def _await_menu_rebuild(restaurant_id: ObjectId, version: int) -> Optional[MenuSnapshot]:
+    # The pass in flight may have started before `version` was written, the one after it has not:
+    # a read waits for at most those two, however long a burst of writes keeps rebuilding.
+    if restaurant_id not in _menu_rebuilds:
+        schedule_menu_rebuild(restaurant_id)
+    for _ in range(2):
+        task = _menu_rebuilds.get(restaurant_id)
+        if task is None:
+            return None
+        try:
+            snapshot = await asyncio.shield(task)
+        except Exception:
+            return None  # Logged by the pass; the reader falls back to what is published.
+        if snapshot is None or snapshot.version >= version:
+            return snapshot
+    return None
+
+
+def _drop_stale_menu(restaurant_id: ObjectId, version: int) -> None:
+    cached = public_menu_cache.peek(restaurant_id)
+    if cached is not None and cached.version < version:
+        public_menu_cache.invalidate(restaurant_id)
+
+
+menu_events.version_listeners.append(_drop_stale_menu)
+
+
+async def get_public_menu_snapshot(restaurant_id: ObjectId) -> Optional[MenuSnapshot]:
+    # A cached copy is served without touching the database; the event hub drops it once any worker
+    # writes a newer version. On a miss the restaurant's version is the source of truth, and a published
+    # copy that fell behind it (a crash before its rebuild, an oversized menu) is rebuilt.
+    generation = public_menu_cache.generation(restaurant_id)
+    cached = public_menu_cache.get(restaurant_id)
+    if cached is not None:
+        return cached
+
+    # Followed before the version is read, so a write landing in between still reaches the cache. The
+    # cached copy keeps the follow until it is removed; a read that caches nothing hands it back.
+    menu_events.follow(restaurant_id)
+    kept = False
+    try:
+        restaurant = await users_col.find_one({'_id': restaurant_id}, {'menu_version': 1})
+        if restaurant is None:
+            return None
+        version = menu_version(restaurant)
+        published = await published_menus_col.find_one({'_id': restaurant_id})
+        snapshot = None
+        if published is not None and published.get('payload') is not None:
+            snapshot = menu_snapshot(restaurant_id, published['version'], published['payload'])
+        if snapshot is None or snapshot.version < version:
+            snapshot = await _await_menu_rebuild(restaurant_id, version) or snapshot
+        if snapshot is None:
+            snapshot = await rebuild_published_menu(restaurant_id)
+        # Only a copy at the current version is cached: nothing would tell this worker to drop an older one.
+        kept = (
+            snapshot is not None
+            and snapshot.version >= version
+            and public_menu_cache.peek(restaurant_id) is None
+            and public_menu_cache.set(restaurant_id, snapshot, size=snapshot.size, generation=generation)
+        )
+        return snapshot
+    finally:
+        if not kept:
+            menu_events.unfollow(restaurant_id)
+
+
+async def encoded_menu_payload(restaurant_id: ObjectId, snapshot: MenuSnapshot, encoding: str) -> bytes:
+    # Compressed once per menu version: the variant lives on the cached snapshot until the next write.
+    encoded = snapshot.encoded.get(encoding)
+    if encoded is None:
+        encoded = await asyncio.to_thread(precompress, snapshot.payload, encoding)
+        snapshot.encoded[encoding] = encoded
+        public_menu_cache.resize(restaurant_id, snapshot, snapshot.size)
+    return encoded
+
+
+def menu_change_entries(changes: Iterable[MenuChange] = ()) -> List[Dict[str, Any]]:
+    entries = [{'kind': kind, 'id': entity_id} for kind, entity_id in dict.fromkeys(changes)]
+    if not entries or len(entries) > MENU_CHANGE_MAX_ENTRIES:
+        entries = [{'kind': FULL_MENU_CHANGE}]
+    return entries
+
+
+def menu_change_update(changes: Iterable[MenuChange] = ()) -> Dict[str, Any]:
+    # Each version pushes exactly one history entry, so an entry's position gives its sequence number.
+    return {
+        '$inc': {'menu_version': 1},
+        '$push': {'menu_changes': {'$each': [menu_change_entries(changes)], '$slice': -MENU_CHANGE_LOG_SIZE}},
+    }
+
+
+def menu_change_pipeline(changes: Iterable[MenuChange], set_fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # menu_change_update as an update pipeline, so set_fields can be computed from the stored document.
+    history = {'$concatArrays': [{'$ifNull': ['$menu_changes', []]}, {'$literal': [menu_change_entries(changes)]}]}
+    return [
+        {
+            '$set': {
+                **set_fields,
+                'menu_version': {'$add': [{'$ifNull': ['$menu_version', 0]}, 1]},
+                'menu_changes': {'$slice': [history, -MENU_CHANGE_LOG_SIZE]},
+            }
+        }
+    ]
+
+
+async def record_menu_change(
+    restaurant_id: ObjectId,
+    changes: Iterable[MenuChange] = (),
+    set_fields: Optional[Dict[str, Any]] = None,
+    fields: Iterable[str] = (),
+) -> Dict[str, Any]:
+    # Writes that do not say what they touched make delta clients reload the whole menu.
+    # set_fields rides along for writes to the restaurant document itself, saving a round trip. Its values
+    # are aggregation expressions over the stored document, so a field can be set conditionally; the
+    # restaurant is returned with `fields` after the update.
+    update = menu_change_pipeline(changes, set_fields) if set_fields else menu_change_update(changes)
+    restaurant = await users_col.find_one_and_update(
+        {'_id': restaurant_id},
+        update,
+        projection={'menu_version': 1, **{field: 1 for field in fields}},
+        return_document=ReturnDocument.AFTER,
+    ) or {}
+    public_menu_cache.invalidate(restaurant_id)
+    schedule_menu_rebuild(restaurant_id)
+    menu_events.publish(restaurant_id, menu_version(restaurant))
+    for listener in menu_change_listeners:
+        listener(restaurant_id)
+    return restaurant
+
+
+async def mark_menu_changed(
+    restaurant_id: ObjectId, changes: Iterable[MenuChange] = (), set_fields: Optional[Dict[str, Any]] = None
+) -> int:
+    return menu_version(await record_menu_change(restaurant_id, changes, set_fields))
+
+
+def menu_images(restaurant_id: ObjectId) -> ImageUploads:
+    # Resized variants land after the response; announce() refreshes the menu once they all exist.
+    return ImageUploads(lambda urls: mark_menu_changed(restaurant_id, [('image', url) for url in urls]))
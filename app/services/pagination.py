@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId, json_util
+from fastapi import HTTPException, status
+
+from app.core.config import DEFAULT_PAGE_LIMIT
+
+CATEGORY_SORT_KEYS = ('name', '_id')
+TEMPLATE_SORT_KEYS = ('name', '_id')
+
+
+def encode_cursor(doc: Dict[str, Any], sort_keys: Sequence[str]) -> str:
+    raw = json_util.dumps([doc.get(key, '') for key in sort_keys], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_keys: Sequence[str]) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json_util.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError, json.JSONDecodeError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(sort_keys) or not isinstance(values[-1], ObjectId):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+    return values
+
+
+def keyset_filter(sort_keys: Sequence[str], values: Sequence[Any]) -> Dict[str, Any]:
+    # (a, b, c) > (x, y, z)  <=>  a > x  or  (a = x and b > y)  or  (a = x and b = y and c > z)
+    clauses = []
+    for position, key in enumerate(sort_keys):
+        clause = {sort_keys[prefix]: values[prefix] for prefix in range(position)}
+        clause[key] = {'$gt': values[position]}
+        clauses.append(clause)
+    return {'$or': clauses}
+
+
+async def fetch_page(
+    collection: Any,
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, int]],
+    sort_keys: Sequence[str],
+    limit: int,
+    cursor: str = '',
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    if cursor:
+        query = {**query, **keyset_filter(sort_keys, decode_cursor(cursor, sort_keys))}
+    if projection is not None:
+        projection = {**projection, **{key: 1 for key in sort_keys}}
+
+    docs = await collection.find(query, projection).sort([(key, 1) for key in sort_keys]).limit(limit + 1).to_list()
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], sort_keys)
+
+
+def page_limit(limit: Optional[int], cursor: str) -> Optional[int]:
+    # Listings without limit or cursor stay unpaginated for existing clients.
+    if limit is None and cursor:
+        return DEFAULT_PAGE_LIMIT
+    return limit
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import (
+    PASSWORD_HASH_MAX_CONCURRENCY,
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+    PASSWORD_HASH_WORKERS,
+)
+from app.core.metrics import Histogram, LatencyHistogram
+from app.core.process_pool import ProcessPool
+from app.core.security import build_password_hash, verify_password
+
+auth_latency_seconds = Histogram('auth_latency_seconds', 'Authentication latency by stage.', ('stage',))
+auth_latency: Dict[str, LatencyHistogram] = {
+    stage: auth_latency_seconds.labels(stage) for stage in ('register', 'login', 'hash_queue_wait', 'hash_compute')
+}
+
+_pool = ProcessPool(PASSWORD_HASH_WORKERS)
+_slots: Optional[asyncio.Semaphore] = None
+_in_flight = 0
+_rejected = 0
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PASSWORD_HASH_MAX_CONCURRENCY)
+    return _slots
+
+
+async def _run_in_hash_pool(func: Callable[..., Any], *args: Any) -> Any:
+    global _in_flight, _rejected
+    slots = _get_slots()
+    queued_at = time.perf_counter()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError as exc:
+        _rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Authentication is busy, please retry shortly',
+            headers={'Retry-After': '1'},
+        ) from exc
+    auth_latency['hash_queue_wait'].observe(time.perf_counter() - queued_at)
+
+    _in_flight += 1
+    try:
+        with auth_latency['hash_compute'].time():
+            return await _pool.run(func, *args)
+    finally:
+        _in_flight -= 1
+        slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(build_password_hash, password)
+
+
+async def verify_password_async(password: str, stored_hash: str) -> bool:
+    return await _run_in_hash_pool(verify_password, password, stored_hash)
+
+
+def shutdown_password_workers() -> None:
+    _pool.shutdown()
+
+
+def auth_stats() -> Dict[str, Any]:
+    return {
+        'in_flight': _in_flight,
+        'rejected': _rejected,
+        'max_concurrency': PASSWORD_HASH_MAX_CONCURRENCY,
+        'workers': PASSWORD_HASH_WORKERS,
+        'latency': {name: histogram.snapshot() for name, histogram in auth_latency.items()},
+    }
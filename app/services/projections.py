@@ -0,0 +1,43 @@
+from typing import Dict, List, Sequence
+
+from fastapi import HTTPException, status
+
+USER_PRINCIPAL_PROJECTION = {'email': 1, 'restaurant_name': 1, 'template_id': 1}
+USER_LOGIN_PROJECTION = {**USER_PRINCIPAL_PROJECTION, 'password_hash': 1}
+PUBLIC_RESTAURANT_PROJECTION = {'restaurant_name': 1, 'template_id': 1, 'menu_version': 1}
+
+ITEM_FIELDS = ('id', 'restaurant_id', 'name', 'category', 'description', 'image_url', 'price')
+ITEM_SUMMARY_FIELDS = ('id', 'name', 'category', 'price')
+CATEGORY_FIELDS = ('id', 'restaurant_id', 'name', 'description', 'image_url')
+CATEGORY_SUMMARY_FIELDS = ('id', 'name')
+TEMPLATE_FIELDS = ('id', 'name', 'description', 'style_id', 'is_custom', 'asset_url', 'asset_type')
+TEMPLATE_SUMMARY_FIELDS = ('id', 'name', 'style_id', 'is_custom', 'asset_type')
+
+VIEW_PATTERN = '^(summary|full)$'
+
+# Response fields that are derived rather than stored under the same name.
+_DOCUMENT_KEYS = {'id': ('_id',), 'style_id': (), 'is_custom': (), 'category': ('category_id', 'category')}
+
+
+def select_fields(view: str, fields: str, full: Sequence[str], summary: Sequence[str]) -> List[str]:
+    if not fields:
+        return list(summary if view == 'summary' else full)
+
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in full]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    # The id is always returned so lean rows can be expanded on demand.
+    return ['id'] + [field for field in full if field in requested and field != 'id']
+
+
+def mongo_projection(fields: Sequence[str], always: Sequence[str] = ()) -> Dict[str, int]:
+    projection: Dict[str, int] = {}
+    for field in list(fields) + list(always):
+        for key in _DOCUMENT_KEYS.get(field, (field,)):
+            if key != '_id':
+                projection[key] = 1
+    return projection or {'_id': 1}
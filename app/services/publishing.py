@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import html
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+import orjson
+from bson import ObjectId
+
+from app.core.blobs import write_atomic
+from app.core.config import PUBLISH_DEBOUNCE_SECONDS, PUBLISH_DIR, PUBLISH_HTML, PUBLISH_KEEP_VERSIONS
+from app.services.menu import get_public_menu_snapshot
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_FILE_MODE = 0o644
+
+_deadlines: Dict[ObjectId, float] = {}
+_publishers: Dict[ObjectId, asyncio.Task] = {}
+
+
+class PublishedMenu(NamedTuple):
+    restaurant_id: str
+    digest: str
+    changed: bool
+
+
+def menu_directory(restaurant_id: ObjectId) -> Path:
+    return Path(PUBLISH_DIR) / 'menus' / str(restaurant_id)
+
+
+def render_menu_html(menu: Dict[str, Any]) -> bytes:
+    escape = html.escape
+    sections = []
+    for category, items in menu['categories'].items():
+        meta = menu['category_meta'].get(category, {})
+        rows = []
+        for item in items:
+            image = f'<img src="{escape(item["image_url"])}" alt="" loading="lazy">' if item.get('image_url') else ''
+            rows.append(
+                f'<li>{image}<h3>{escape(item["name"])}</h3><p>{escape(item.get("description", ""))}</p>'
+                f'<data value="{item["price"]:.2f}">{item["price"]:.2f}</data></li>'
+            )
+        description = f'<p>{escape(meta["description"])}</p>' if meta.get('description') else ''
+        sections.append(f'<section><h2>{escape(category)}</h2>{description}<ul>{"".join(rows)}</ul></section>')
+    title = escape(menu['restaurant_name'])
+    document = (
+        '<!doctype html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f'<title>{title}</title></head>'
+        f'<body class="template-{escape(menu["template_style_id"])}"><h1>{title}</h1>{"".join(sections)}</body></html>'
+    )
+    return document.encode('utf-8')
+
+
+def _prune(directory: Path, suffix: str) -> None:
+    # Older hashed files stay around briefly for clients that fetched the previous manifest.
+    versions = sorted(directory.glob(f'menu.*{suffix}'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in versions[PUBLISH_KEEP_VERSIONS:]:
+        path.unlink(missing_ok=True)
+
+
+def _write_menu_files(directory: Path, digest: str, payload: bytes, etag: str) -> bool:
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / 'manifest.json'
+    try:
+        if orjson.loads(manifest_path.read_bytes()).get('digest') == digest:
+            return False
+    except (OSError, ValueError):
+        pass
+
+    manifest: Dict[str, Any] = {
+        'digest': digest,
+        'etag': etag,
+        'json': f'menu.{digest}.json',
+        'published_at': datetime.now(timezone.utc).isoformat(),
+    }
+    # Hashed files first, then the stable names, then the manifest that points at them.
+    files = {f'menu.{digest}.json': payload}
+    if PUBLISH_HTML:
+        files[f'menu.{digest}.html'] = render_menu_html(orjson.loads(payload))
+        manifest['html'] = f'menu.{digest}.html'
+    for name, data in files.items():
+        write_atomic(directory / name, data, PUBLIC_FILE_MODE)
+    write_atomic(directory / 'menu.json', payload, PUBLIC_FILE_MODE)
+    if PUBLISH_HTML:
+        write_atomic(directory / 'index.html', files[manifest['html']], PUBLIC_FILE_MODE)
+    write_atomic(manifest_path, orjson.dumps(manifest), PUBLIC_FILE_MODE)
+
+    _prune(directory, '.json')
+    if PUBLISH_HTML:
+        _prune(directory, '.html')
+    return True
+
+
+async def publish_menu(restaurant_id: ObjectId) -> Optional[PublishedMenu]:
+    # Same snapshot the public_menu endpoint serves, so both stay byte-for-byte identical.
+    snapshot = await get_public_menu_snapshot(restaurant_id)
+    if snapshot is None:
+        return None
+    digest = hashlib.sha256(snapshot.payload).hexdigest()[:16]
+    changed = await asyncio.to_thread(
+        _write_menu_files, menu_directory(restaurant_id), digest, snapshot.payload, snapshot.etag
+    )
+    return PublishedMenu(str(restaurant_id), digest, changed)
+
+
+async def _publish_when_quiet(restaurant_id: ObjectId) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            delay = _deadlines[restaurant_id] - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            requested = _deadlines[restaurant_id]
+            try:
+                await publish_menu(restaurant_id)
+            except Exception:
+                logger.exception('Publishing the menu of restaurant %s failed', restaurant_id)
+            # Edits that landed while rendering push the deadline and get one more pass.
+            if _deadlines[restaurant_id] == requested:
+                break
+    finally:
+        _deadlines.pop(restaurant_id, None)
+        _publishers.pop(restaurant_id, None)
+
+
+def schedule_publish(restaurant_id: ObjectId) -> None:
+    # Trailing-edge debounce: a burst of edits renders once, PUBLISH_DEBOUNCE_SECONDS after the last one.
+    _deadlines[restaurant_id] = asyncio.get_running_loop().time() + PUBLISH_DEBOUNCE_SECONDS
+    if restaurant_id not in _publishers:
+        _publishers[restaurant_id] = asyncio.create_task(_publish_when_quiet(restaurant_id))
+
+
+async def flush_pending_publishes() -> None:
+    # On shutdown, render whatever is still waiting out its debounce window.
+    pending = list(_publishers.items())
+    for _, task in pending:
+        task.cancel()
+    await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+    await asyncio.gather(*(publish_menu(restaurant_id) for restaurant_id, _ in pending), return_exceptions=True)
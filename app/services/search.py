@@ -0,0 +1,212 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+from app.core.cache import ByteLRUCache
+from app.core.config import SEARCH_INDEX_CACHE_MAX_BYTES
+from app.core.database import users_col
+from app.services.items import list_items_in_menu_order, load_category_order
+from app.services.menu import menu_version
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.projections import ITEM_FIELDS, mongo_projection
+from app.services.serializers import menu_item_response
+
+TOKEN_PATTERN = re.compile(r'\w+')
+FIELD_WEIGHTS = (('name', 3.0), ('category', 2.0), ('description', 1.0))
+EXACT_WEIGHT = 1.0
+FUZZY_WEIGHT = 0.4
+FUZZY_MIN_LENGTH = 4
+MAX_PREFIX_EXPANSIONS = 64
+SEARCH_CURSOR_KEYS = ('score', 'name', '_id')
+
+search_indexes = ByteLRUCache(SEARCH_INDEX_CACHE_MAX_BYTES)
+
+
+def tokenize(text: str) -> List[str]:
+    # Case- and accent-insensitive, so "creme" finds "Crème brûlée".
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return TOKEN_PATTERN.findall(''.join(char for char in decomposed if not unicodedata.combining(char)))
+
+
+def _deletes(term: str) -> Set[str]:
+    return {term[:position] + term[position + 1:] for position in range(len(term))}
+
+
+def within_one_edit(left: str, right: str) -> bool:
+    # One insertion, deletion, substitution or adjacent transposition.
+    if abs(len(left) - len(right)) > 1:
+        return False
+    if len(left) == len(right):
+        diffs = [position for position, (a, b) in enumerate(zip(left, right)) if a != b]
+        if len(diffs) <= 1:
+            return True
+        first, second = diffs[0], diffs[-1]
+        return len(diffs) == 2 and second == first + 1 and left[first] == right[second] and left[second] == right[first]
+    shorter, longer = (left, right) if len(left) < len(right) else (right, left)
+    for position in range(len(longer)):
+        if longer[:position] + longer[position + 1:] == shorter:
+            return True
+    return False
+
+
+class MenuSearchIndex:
+    def __init__(self, version: int) -> None:
+        self.version = version
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._item_terms: Dict[str, Tuple[str, ...]] = {}
+        self._vocabulary: List[str] = []
+        # Symmetric-delete neighbourhoods: terms one edit apart share a key.
+        self._neighbours: Dict[str, Set[str]] = {}
+
+    @property
+    def size(self) -> int:
+        # Rough resident size, used only for the index cache budget.
+        text = sum(len(item['name']) + len(item['description']) + 160 for item in self.items.values())
+        return text + 48 * sum(len(postings) for postings in self._postings.values()) + 96 * len(self._neighbours)
+
+    def _add_term(self, term: str) -> None:
+        insort(self._vocabulary, term)
+        if len(term) >= FUZZY_MIN_LENGTH:
+            for key in {term} | _deletes(term):
+                self._neighbours.setdefault(key, set()).add(term)
+
+    def _drop_term(self, term: str) -> None:
+        del self._vocabulary[bisect_left(self._vocabulary, term)]
+        if len(term) >= FUZZY_MIN_LENGTH:
+            for key in {term} | _deletes(term):
+                terms = self._neighbours[key]
+                terms.discard(term)
+                if not terms:
+                    del self._neighbours[key]
+
+    def add(self, item: Dict[str, Any]) -> None:
+        item_id = item['id']
+        self.remove(item_id)
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(item.get(field, '')):
+                weights[token] = weights.get(token, 0.0) + weight
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._add_term(term)
+            postings[item_id] = weight
+        self.items[item_id] = item
+        self._item_terms[item_id] = tuple(weights)
+
+    def remove(self, item_id: str) -> None:
+        self.items.pop(item_id, None)
+        for term in self._item_terms.pop(item_id, ()):
+            postings = self._postings[term]
+            del postings[item_id]
+            if not postings:
+                del self._postings[term]
+                self._drop_term(term)
+
+    def _expand(self, token: str) -> Iterator[Tuple[str, float]]:
+        if token in self._postings:
+            yield token, EXACT_WEIGHT
+        # Shorter completions rank above longer ones: "pi" prefers "pie" over "pistachio".
+        start = bisect_right(self._vocabulary, token)
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            yield term, 0.5 + 0.4 * len(token) / len(term)
+        if len(token) >= FUZZY_MIN_LENGTH:
+            candidates = set()
+            for key in {token} | _deletes(token):
+                candidates.update(self._neighbours.get(key, ()))
+            for term in candidates:
+                if term != token and not term.startswith(token) and within_one_edit(token, term):
+                    yield term, FUZZY_WEIGHT
+
+    def search(self, query: str) -> Dict[str, float]:
+        # Every query word has to match; each contributes its best match in the item.
+        scores: Optional[Dict[str, float]] = None
+        for token in dict.fromkeys(tokenize(query)):
+            token_scores: Dict[str, float] = {}
+            for term, match_weight in self._expand(token):
+                for item_id, field_weight in self._postings[term].items():
+                    score = match_weight * field_weight
+                    if score > token_scores.get(item_id, 0.0):
+                        token_scores[item_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {item_id: score + token_scores[item_id] for item_id, score in scores.items() if item_id in token_scores}
+            if not scores:
+                break
+        return scores or {}
+
+
+async def build_search_index(restaurant_id: ObjectId, version: int) -> MenuSearchIndex:
+    index = MenuSearchIndex(version)
+    order = await load_category_order(restaurant_id)
+    docs = await list_items_in_menu_order({'restaurant_id': restaurant_id}, mongo_projection(ITEM_FIELDS), order)
+    for doc in docs:
+        index.add(menu_item_response(doc))
+    return index
+
+
+async def menu_search_index(restaurant_id: ObjectId) -> Optional[MenuSearchIndex]:
+    # Built on first query and kept while the menu version stays put; writes from
+    # this worker are applied in place, anything else shows up as a version change.
+    restaurant = await users_col.find_one({'_id': restaurant_id}, {'menu_version': 1})
+    if not restaurant:
+        return None
+    version = menu_version(restaurant)
+    index = search_indexes.get(restaurant_id)
+    if index is None or index.version != version:
+        generation = search_indexes.generation(restaurant_id)
+        index = await build_search_index(restaurant_id, version)
+        search_indexes.set(restaurant_id, index, size=index.size, generation=generation)
+    return index
+
+
+def apply_item_changes(
+    restaurant_id: ObjectId, version: int, upserted: Iterable[Dict[str, Any]] = (), deleted: Iterable[str] = ()
+) -> None:
+    index = search_indexes.get(restaurant_id)
+    if index is None:
+        return
+    if index.version != version - 1:
+        # Another write landed in between; rebuild on the next query instead of guessing.
+        search_indexes.invalidate(restaurant_id)
+        return
+    for item in upserted:
+        index.add(item)
+    for item_id in deleted:
+        index.remove(item_id)
+    index.version = version
+    search_indexes.resize(restaurant_id, index, index.size)
+
+
+def search_page(
+    index: MenuSearchIndex, query: str, limit: int, cursor: str = ''
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # Ranked by score, then name; only the requested page is selected, never the full result set.
+    items = index.items
+    keys: Iterable[Tuple[float, str, str]] = (
+        (-round(score, 4), items[item_id]['name'], item_id) for item_id, score in index.search(query).items()
+    )
+    if cursor:
+        score, name, item_id = decode_cursor(cursor, SEARCH_CURSOR_KEYS)
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not isinstance(name, str):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+        after = (-score, name, str(item_id))
+        keys = (key for key in keys if key > after)
+    page = heapq.nsmallest(limit + 1, keys)
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        score, name, item_id = page[-1]
+        next_cursor = encode_cursor({'score': -score, 'name': name, '_id': ObjectId(item_id)}, SEARCH_CURSOR_KEYS)
+    return [items[item_id] for _, _, item_id in page], next_cursor
@@ -1,8 +1,6 @@
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Sequence
 
-from app.schemas.category import CategoryResponse
-from app.schemas.item import MenuItemResponse
-from app.schemas.template import TemplateResponse
+from app.core.blobs import resolve_blob_url
 
 
 def parse_user(user_doc: Dict[str, Any]) -> Dict[str, Any]:
@@ -14,35 +12,68 @@ def parse_user(user_doc: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def menu_item_response(item_doc: Dict[str, Any]) -> MenuItemResponse:
-    return MenuItemResponse(
-        id=str(item_doc['_id']),
-        restaurant_id=str(item_doc['restaurant_id']),
-        name=item_doc['name'],
-        category=item_doc['category'],
-        description=item_doc.get('description', ''),
-        image_url=item_doc.get('image_url', ''),
-        price=float(item_doc['price']),
-    )
-
-
-def category_response(category_doc: Dict[str, Any]) -> CategoryResponse:
-    return CategoryResponse(
-        id=str(category_doc['_id']),
-        restaurant_id=str(category_doc['restaurant_id']),
-        name=category_doc['name'],
-        description=category_doc.get('description', ''),
-        image_url=category_doc.get('image_url', ''),
-    )
-
-
-def template_response(template_doc: Dict[str, Any]) -> TemplateResponse:
-    return TemplateResponse(
-        id=template_doc['id'],
-        name=template_doc['name'],
-        description=template_doc.get('description', ''),
-        style_id=template_doc['style_id'],
-        is_custom=template_doc['is_custom'],
-        asset_url=template_doc.get('asset_url', ''),
-        asset_type=template_doc.get('asset_type', ''),
-    )
+# Documents go straight to plain dicts that orjson encodes; the Pydantic response
+# models only describe these shapes in the OpenAPI schema.
+def menu_item_response(item_doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': str(item_doc['_id']),
+        'restaurant_id': str(item_doc['restaurant_id']),
+        'name': item_doc['name'],
+        'category': item_doc['category'],
+        'description': item_doc.get('description', ''),
+        'image_url': resolve_blob_url(item_doc.get('image_url', '')),
+        'price': float(item_doc['price']),
+    }
+
+
+def category_response(category_doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': str(category_doc['_id']),
+        'restaurant_id': str(category_doc['restaurant_id']),
+        'name': category_doc['name'],
+        'description': category_doc.get('description', ''),
+        'image_url': resolve_blob_url(category_doc.get('image_url', '')),
+    }
+
+
+def template_response(template_doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': template_doc['id'],
+        'name': template_doc['name'],
+        'description': template_doc.get('description', ''),
+        'style_id': template_doc['style_id'],
+        'is_custom': template_doc['is_custom'],
+        'asset_url': template_doc.get('asset_url', ''),
+        'asset_type': template_doc.get('asset_type', ''),
+    }
+
+
+_ITEM_FIELD_SERIALIZERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'id': lambda doc: str(doc['_id']),
+    'restaurant_id': lambda doc: str(doc['restaurant_id']),
+    'name': lambda doc: doc['name'],
+    'category': lambda doc: doc['category'],
+    'description': lambda doc: doc.get('description', ''),
+    'image_url': lambda doc: resolve_blob_url(doc.get('image_url', '')),
+    'price': lambda doc: float(doc['price']),
+}
+
+_CATEGORY_FIELD_SERIALIZERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'id': lambda doc: str(doc['_id']),
+    'restaurant_id': lambda doc: str(doc['restaurant_id']),
+    'name': lambda doc: doc['name'],
+    'description': lambda doc: doc.get('description', ''),
+    'image_url': lambda doc: resolve_blob_url(doc.get('image_url', '')),
+}
+
+
+def menu_item_fields(item_doc: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: _ITEM_FIELD_SERIALIZERS[field](item_doc) for field in fields}
+
+
+def category_fields(category_doc: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: _CATEGORY_FIELD_SERIALIZERS[field](category_doc) for field in fields}
+
+
+def template_fields(template: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: template.get(field, '') for field in fields}
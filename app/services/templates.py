@@ -1,9 +1,12 @@
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from bson import ObjectId
 
+from app.core.blobs import resolve_blob_url
+from app.core.config import API_BASE_URL
 from app.core.database import templates_col
+from app.services.pagination import TEMPLATE_SORT_KEYS, fetch_page
 
 MENU_TEMPLATES: List[Dict[str, Any]] = [
     {
@@ -45,38 +48,69 @@ def builtin_templates() -> List[Dict[str, Any]]:
     return [dict(tpl) for tpl in MENU_TEMPLATES]
 
 
-def all_templates_for_restaurant(restaurant_id: ObjectId) -> List[Dict[str, Any]]:
-    custom = []
-    for doc in templates_col.find({'restaurant_id': restaurant_id}).sort([('name', 1)]):
-        custom.append(
-            {
-                'id': str(doc['_id']),
-                'name': doc['name'],
-                'description': doc.get('description', ''),
-                'style_id': 'custom-upload',
-                'is_custom': True,
-                'asset_url': doc.get('asset_url', ''),
-                'asset_type': doc.get('asset_type', ''),
-            }
-        )
-    return builtin_templates() + custom
-
-
-def find_template_for_restaurant(restaurant_id: ObjectId, template_id: str) -> Optional[Dict[str, Any]]:
+def template_asset_path(template_id: Any) -> str:
+    return f'/restaurant/templates/{template_id}/asset'
+
+
+def public_template_asset_path(restaurant_id: Any) -> str:
+    return f'/public/menu/{restaurant_id}/template/asset'
+
+
+def template_asset_url(doc: Dict[str, Any]) -> str:
+    # Listings link to the asset rather than carrying it: blobs by their immutable URL,
+    # inline legacy uploads through the template's asset endpoint.
+    stored = doc.get('asset_url', '')
+    if stored.startswith('data:'):
+        return f'{API_BASE_URL}{template_asset_path(doc["_id"])}'
+    return resolve_blob_url(stored)
+
+
+def public_template_asset_url(restaurant_id: ObjectId, template: Dict[str, Any]) -> str:
+    asset_url = template.get('asset_url', '')
+    if template['is_custom'] and asset_url == f'{API_BASE_URL}{template_asset_path(template["id"])}':
+        return f'{API_BASE_URL}{public_template_asset_path(restaurant_id)}'
+    return asset_url
+
+
+def custom_template(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': str(doc['_id']),
+        'name': doc['name'],
+        'description': doc.get('description', ''),
+        'style_id': 'custom-upload',
+        'is_custom': True,
+        'asset_url': template_asset_url(doc),
+        'asset_type': doc.get('asset_type', ''),
+    }
+
+
+async def all_templates_for_restaurant(
+    restaurant_id: ObjectId, projection: Optional[Dict[str, int]] = None
+) -> List[Dict[str, Any]]:
+    cursor = templates_col.find({'restaurant_id': restaurant_id}, projection).sort([('name', 1)])
+    return builtin_templates() + [custom_template(doc) async for doc in cursor]
+
+
+async def templates_page_for_restaurant(
+    restaurant_id: ObjectId, projection: Optional[Dict[str, int]], limit: int, cursor: str = ''
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # Built-ins lead the first page; only the restaurant's own templates are paged.
+    docs, next_cursor = await fetch_page(
+        templates_col, {'restaurant_id': restaurant_id}, projection, TEMPLATE_SORT_KEYS, limit, cursor
+    )
+    templates = [custom_template(doc) for doc in docs]
+    return (templates if cursor else builtin_templates() + templates), next_cursor
+
+
+async def find_template_for_restaurant(
+    restaurant_id: ObjectId, template_id: str, projection: Optional[Dict[str, int]] = None
+) -> Optional[Dict[str, Any]]:
     builtin_map = {tpl['id']: tpl for tpl in builtin_templates()}
     if template_id in builtin_map:
         return builtin_map[template_id]
 
     if ObjectId.is_valid(template_id):
-        custom = templates_col.find_one({'_id': ObjectId(template_id), 'restaurant_id': restaurant_id})
+        custom = await templates_col.find_one({'_id': ObjectId(template_id), 'restaurant_id': restaurant_id}, projection)
         if custom:
-            return {
-                'id': str(custom['_id']),
-                'name': custom['name'],
-                'description': custom.get('description', ''),
-                'style_id': 'custom-upload',
-                'is_custom': True,
-                'asset_url': custom.get('asset_url', ''),
-                'asset_type': custom.get('asset_type', ''),
-            }
+            return custom_template(custom)
     return None
@@ -0,0 +1,300 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
+
+import orjson
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.blobs import IMAGE_CONTENT_TYPES, TEMPLATE_ASSET_CONTENT_TYPES, blob_data_url, resolve_blob_url
+from app.core.config import IMPORT_BATCH_SIZE, IMPORT_MAX_LINE_BYTES
+from app.core.database import categories_col, items_col, templates_col, users_col
+from app.dependencies.auth import invalidate_principal
+from app.schemas.category import CategoryCreateRequest
+from app.schemas.item import MenuItemCreateRequest
+from app.schemas.template import TemplateCreateRequest
+from app.services.batch import DUPLICATE_KEY_ERROR
+from app.services.categories import normalize_category_name
+from app.services.items import load_category_order, with_category_name
+from app.services.menu import mark_menu_changed, menu_images
+from app.services.pagination import CATEGORY_SORT_KEYS, TEMPLATE_SORT_KEYS
+from app.services.templates import VALID_TEMPLATE_IDS, normalize_template_name
+
+EXPORT_FORMAT_VERSION = 1
+ITEM_EXPORT_SORT_KEYS = ('category_id', 'name', '_id')
+RECORD_SCHEMAS = {
+    'category': CategoryCreateRequest,
+    'item': MenuItemCreateRequest,
+    'template': TemplateCreateRequest,
+}
+
+
+def _ndjson_line(record: Dict[str, Any]) -> bytes:
+    return orjson.dumps(record) + b'\n'
+
+
+def _sort(keys: Tuple[str, ...]) -> List[Tuple[str, int]]:
+    return [(key, 1) for key in keys]
+
+
+async def export_menu_lines(restaurant_id: ObjectId, include_media: bool = False) -> AsyncIterator[bytes]:
+    async def media(value: str) -> str:
+        return await blob_data_url(value) if include_media else resolve_blob_url(value)
+
+    restaurant = await users_col.find_one({'_id': restaurant_id}, {'restaurant_name': 1, 'template_id': 1}) or {}
+    yield _ndjson_line(
+        {
+            'type': 'restaurant',
+            'version': EXPORT_FORMAT_VERSION,
+            'restaurant_name': restaurant.get('restaurant_name', ''),
+            'template_id': restaurant.get('template_id', 'classic-blue'),
+        }
+    )
+
+    async for doc in templates_col.find({'restaurant_id': restaurant_id}).sort(_sort(TEMPLATE_SORT_KEYS)):
+        yield _ndjson_line(
+            {
+                'type': 'template',
+                'id': str(doc['_id']),
+                'name': doc['name'],
+                'description': doc.get('description', ''),
+                'asset_url': await media(doc.get('asset_url', '')),
+                'asset_type': doc.get('asset_type', ''),
+            }
+        )
+
+    async for doc in categories_col.find({'restaurant_id': restaurant_id}).sort(_sort(CATEGORY_SORT_KEYS)):
+        yield _ndjson_line(
+            {
+                'type': 'category',
+                'id': str(doc['_id']),
+                'name': doc['name'],
+                'description': doc.get('description', ''),
+                'image_url': await media(doc.get('image_url', '')),
+            }
+        )
+
+    names_by_id = {category_id: name for name, category_id in await load_category_order(restaurant_id)}
+    async for doc in items_col.find({'restaurant_id': restaurant_id}).sort(_sort(ITEM_EXPORT_SORT_KEYS)):
+        yield _ndjson_line(
+            {
+                'type': 'item',
+                'id': str(doc['_id']),
+                'name': doc['name'],
+                'category': with_category_name(doc, names_by_id)['category'],
+                'description': doc.get('description', ''),
+                'image_url': await media(doc.get('image_url', '')),
+                'price': float(doc['price']),
+            }
+        )
+
+
+def _line_error(line_number: int, detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'Line {line_number}: {detail}')
+
+
+def _parse_line(raw: bytes, line_number: int) -> Optional[Dict[str, Any]]:
+    if not raw.strip():
+        return None
+    try:
+        record = orjson.loads(raw)
+    except ValueError as exc:
+        raise _line_error(line_number, 'invalid JSON') from exc
+    if not isinstance(record, dict):
+        raise _line_error(line_number, 'expected a JSON object')
+    return record
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    # Only the current partial line is buffered, so memory is bounded by the longest line.
+    buffer = bytearray()
+    line_number = 0
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end == -1:
+                break
+            line_number += 1
+            record = _parse_line(bytes(buffer[start:end]), line_number)
+            if record is not None:
+                yield line_number, record
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f'Line {line_number + 1}: exceeds {IMPORT_MAX_LINE_BYTES} bytes',
+            )
+    record = _parse_line(bytes(buffer), line_number + 1)
+    if record is not None:
+        yield line_number + 1, record
+
+
+class MenuImporter:
+    def __init__(self, restaurant_id: ObjectId):
+        self.restaurant_id = restaurant_id
+        self.now = datetime.now(timezone.utc)
+        self.category_ids: Dict[str, Optional[ObjectId]] = {}
+        self.template_keys: Dict[str, str] = {}
+        self.selected_template_id = ''
+        self.pending: Dict[str, List[UpdateOne]] = {'templates': [], 'categories': [], 'items': []}
+        # Source line of each pending write, so a failed write is reported against its line.
+        self.pending_lines: Dict[str, List[int]] = {'templates': [], 'categories': [], 'items': []}
+        self.counts = {'templates': 0, 'categories': 0, 'items': 0}
+        self.images = menu_images(restaurant_id)
+
+    async def load(self) -> None:
+        cursor = categories_col.find({'restaurant_id': self.restaurant_id}, {'name_key': 1})
+        self.category_ids = {doc['name_key']: doc['_id'] async for doc in cursor}
+
+    def _upsert(self, kind: str, line_number: int, key: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        self.pending[kind].append(
+            UpdateOne(
+                {'restaurant_id': self.restaurant_id, **key},
+                {'$set': {**fields, 'updated_at': self.now}, '$setOnInsert': {'created_at': self.now}},
+                upsert=True,
+            )
+        )
+        self.pending_lines[kind].append(line_number)
+
+    async def _store_media(
+        self, line_number: int, value: str, allowed_types: FrozenSet[str] = IMAGE_CONTENT_TYPES
+    ) -> str:
+        try:
+            return await self.images.store(value, allowed_types)
+        except HTTPException as exc:
+            raise _line_error(line_number, exc.detail) from exc
+
+    async def add(self, line_number: int, record: Dict[str, Any]) -> None:
+        record_type = record.get('type')
+        if record_type == 'restaurant':
+            self.selected_template_id = str(record.get('template_id', ''))
+            return
+        schema = RECORD_SCHEMAS.get(record_type)
+        if schema is None:
+            raise _line_error(line_number, f'unknown record type {record_type!r}')
+        try:
+            payload: BaseModel = schema.model_validate(record)
+        except ValidationError as exc:
+            raise _line_error(line_number, f'invalid {record_type}: {exc.errors()[0]["msg"]}') from exc
+
+        if record_type == 'template':
+            await self._add_template(line_number, str(record.get('id', '')), payload)
+        elif record_type == 'category':
+            await self._add_category(line_number, payload)
+        else:
+            await self._add_item(line_number, payload)
+        if sum(len(writes) for writes in self.pending.values()) >= IMPORT_BATCH_SIZE:
+            await self.flush()
+
+    async def _add_template(self, line_number: int, exported_id: str, payload: TemplateCreateRequest) -> None:
+        name = normalize_template_name(payload.name)
+        asset_url = payload.asset_url.strip()
+        asset_type = payload.asset_type.strip().lower() if asset_url else ''
+        if not name:
+            raise _line_error(line_number, 'template name cannot be empty')
+        if asset_url and asset_type not in TEMPLATE_ASSET_CONTENT_TYPES:
+            raise _line_error(line_number, 'invalid template file type')
+        if exported_id:
+            self.template_keys[exported_id] = name.lower()
+        fields = {
+            'name': name,
+            'description': payload.description.strip(),
+            'asset_url': await self._store_media(
+                line_number, asset_url, TEMPLATE_ASSET_CONTENT_TYPES.get(asset_type, IMAGE_CONTENT_TYPES)
+            ),
+            'asset_type': asset_type,
+        }
+        self._upsert('templates', line_number, {'name_key': name.lower()}, fields)
+
+    async def _add_category(self, line_number: int, payload: CategoryCreateRequest) -> None:
+        name = normalize_category_name(payload.name)
+        if not name:
+            raise _line_error(line_number, 'category name cannot be empty')
+        self.category_ids.setdefault(name.lower(), None)
+        fields = {
+            'name': name,
+            'description': payload.description.strip(),
+            'image_url': await self._store_media(line_number, payload.image_url.strip()),
+        }
+        self._upsert('categories', line_number, {'name_key': name.lower()}, fields)
+
+    async def _add_item(self, line_number: int, payload: MenuItemCreateRequest) -> None:
+        category_key = normalize_category_name(payload.category).lower()
+        if category_key not in self.category_ids:
+            raise _line_error(line_number, 'category not found; categories must precede their items')
+        if self.category_ids[category_key] is None:
+            await self.flush()
+        fields = {
+            'description': payload.description.strip(),
+            'image_url': await self._store_media(line_number, payload.image_url.strip()),
+            'price': round(payload.price, 2),
+        }
+        key = {'category_id': self.category_ids[category_key], 'name': payload.name.strip()}
+        self._upsert('items', line_number, key, fields)
+
+    async def flush(self) -> None:
+        # Parents go first so a flushed item never points at an unflushed category.
+        for kind, collection in (('templates', templates_col), ('categories', categories_col), ('items', items_col)):
+            writes, lines = self.pending[kind], self.pending_lines[kind]
+            if writes:
+                self.pending[kind], self.pending_lines[kind] = [], []
+                try:
+                    await collection.bulk_write(writes, ordered=False)
+                except BulkWriteError as exc:
+                    errors = exc.details.get('writeErrors', [])
+                    self.counts[kind] += len(writes) - len(errors)
+                    if not errors:
+                        raise
+                    error = min(errors, key=lambda error: error['index'])
+                    if error.get('code') == DUPLICATE_KEY_ERROR:
+                        detail = f'{kind[:-1]} already exists'
+                    else:
+                        detail = error.get('errmsg', 'write failed')
+                    raise _line_error(lines[error['index']], detail) from exc
+                self.counts[kind] += len(writes)
+            if kind == 'categories':
+                await self._resolve_category_ids()
+
+    async def _resolve_category_ids(self) -> None:
+        unresolved = [key for key, category_id in self.category_ids.items() if category_id is None]
+        if unresolved:
+            cursor = categories_col.find({'restaurant_id': self.restaurant_id, 'name_key': {'$in': unresolved}}, {'name_key': 1})
+            self.category_ids.update({doc['name_key']: doc['_id'] async for doc in cursor})
+
+    async def select_template(self) -> Optional[str]:
+        template_id = self.selected_template_id
+        if template_id in self.template_keys:
+            doc = await templates_col.find_one(
+                {'restaurant_id': self.restaurant_id, 'name_key': self.template_keys[template_id]}, {'_id': 1}
+            )
+            template_id = str(doc['_id']) if doc else ''
+        if template_id not in VALID_TEMPLATE_IDS and not (
+            ObjectId.is_valid(template_id)
+            and await templates_col.find_one({'_id': ObjectId(template_id), 'restaurant_id': self.restaurant_id}, {'_id': 1})
+        ):
+            return None
+        await users_col.update_one({'_id': self.restaurant_id}, {'$set': {'template_id': template_id}})
+        invalidate_principal(self.restaurant_id)
+        return template_id
+
+
+async def import_menu_lines(restaurant_id: ObjectId, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    importer = MenuImporter(restaurant_id)
+    await importer.load()
+    template_id = None
+    try:
+        async for line_number, record in iter_ndjson(chunks):
+            await importer.add(line_number, record)
+        await importer.flush()
+        template_id = await importer.select_template() if importer.selected_template_id else None
+    finally:
+        # Earlier batches stay applied when a later line fails; re-importing the same file is idempotent.
+        if any(importer.counts.values()) or template_id:
+            await mark_menu_changed(restaurant_id)
+            importer.images.announce()
+    return {'imported': importer.counts, 'template_id': template_id}
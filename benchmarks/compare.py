@@ -0,0 +1,60 @@
+"""Compare two load-test baselines written by benchmarks.load.
+
+    python -m benchmarks.compare benchmarks/results/main.json benchmarks/results/HEAD.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'peak_rss_mb')
+HIGHER_IS_BETTER = {'throughput_rps'}
+
+
+def load_results(path: str) -> Tuple[Dict[str, Any], Dict[Tuple[int, str, str], Dict[str, Any]]]:
+    report = json.loads(Path(path).read_text())
+    results = {(row['tenant_items'], row['images'], row['scenario']): row for row in report['results']}
+    return report['meta'], results
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change reported as a regression')
+    args = parser.parse_args(argv)
+
+    baseline_meta, baseline = load_results(args.baseline)
+    candidate_meta, candidate = load_results(args.candidate)
+    print(f"baseline {baseline_meta.get('revision') or args.baseline} -> candidate {candidate_meta.get('revision') or args.candidate}")
+
+    metrics = METRICS
+    if baseline_meta.get('rss') != candidate_meta.get('rss'):
+        # Older baselines measured RSS for the whole run, so it only grows from one scenario to the next.
+        print('peak_rss_mb skipped: the baselines measured RSS differently')
+        metrics = tuple(metric for metric in METRICS if metric != 'peak_rss_mb')
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        cells = []
+        for metric in metrics:
+            delta = change(baseline[key][metric], candidate[key][metric])
+            worse = -delta if metric in HIGHER_IS_BETTER else delta
+            flag = '!' if worse > args.threshold else ' '
+            regressions += flag == '!'
+            cells.append(f'{metric} {candidate[key][metric]:>9} ({delta:+6.1f}%){flag}')
+        size, images, scenario = key
+        print(f"{size:>6} {images:<6} {scenario:<20} " + '  '.join(cells))
+
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{key[0]:>6} {key[1]:<6} {key[2]:<20} only in {'baseline' if key in baseline else 'candidate'}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,283 @@
+"""Load-test the hot endpoints against seeded synthetic tenants and save a JSON baseline.
+
+Runs fully offline: without --mongo-uri the app talks to an in-memory mongomock stand-in
+and stores blobs on a temporary filesystem backend. Every scenario runs in a fresh process
+that seeds its own tenant, so its peak RSS is not inflated by the scenarios before it.
+
+    python -m benchmarks.load --sizes 10,500,5000 --images both --output benchmarks/results/HEAD.json
+    python -m benchmarks.load --mongo-uri mongodb://localhost:27017/MenuBench
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+PASSWORD = 'Bench-Passw0rd!'
+SCENARIOS = ('public_menu', 'list_my_menu_items', 'login', 'restaurant_qr')
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,500,5000', help='comma separated item counts per tenant')
+    parser.add_argument('--images', choices=('none', 'inline', 'both'), default='both')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--login-requests', type=int, default=40, help='login is CPU-bound by design')
+    parser.add_argument('--mongo-uri', default='', help='use a real mongod instead of the in-memory stand-in')
+    parser.add_argument('--output', default='', help='write results as JSON to this path')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    # Must run before the app is imported: settings are read at import time.
+    if args.mongo_uri:
+        os.environ['MONGO_URI'] = args.mongo_uri
+    else:
+        os.environ['BLOB_BACKEND'] = 'filesystem'
+        os.environ['BLOB_STORAGE_DIR'] = tempfile.mkdtemp(prefix='menu-bench-blobs-')
+
+
+def sample_image_data_url() -> str:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 240), (180, 90, 40)).save(buffer, 'JPEG', quality=80)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+async def seed_tenant(item_count: int, with_images: bool) -> Tuple[str, str]:
+    from bson import ObjectId
+
+    from app.core.database import categories_col, items_col, users_col
+    from app.core.security import build_password_hash
+
+    restaurant_id = ObjectId()
+    email = f'bench-{restaurant_id}@example.com'
+    now = datetime.now(timezone.utc)
+    await users_col.insert_one(
+        {
+            '_id': restaurant_id,
+            'email': email,
+            'password_hash': build_password_hash(PASSWORD),
+            'restaurant_name': f'Bench {item_count}',
+            'template_id': 'classic-blue',
+            'created_at': now,
+        }
+    )
+
+    image_url = sample_image_data_url() if with_images else ''
+    category_ids = [ObjectId() for _ in range(max(1, min(40, item_count // 12)))]
+    await categories_col.insert_many(
+        [
+            {
+                '_id': category_id,
+                'restaurant_id': restaurant_id,
+                'name': f'Category {position:02d}',
+                'name_key': f'category {position:02d}',
+                'description': 'Seasonal dishes',
+                'image_url': image_url,
+                'created_at': now,
+            }
+            for position, category_id in enumerate(category_ids)
+        ]
+    )
+    for start in range(0, item_count, 1000):
+        await items_col.insert_many(
+            [
+                {
+                    'restaurant_id': restaurant_id,
+                    'category_id': category_ids[index % len(category_ids)],
+                    'name': f'Menu item {index:05d}',
+                    'description': 'Slow-cooked with seasonal vegetables and a house spice blend.',
+                    'image_url': image_url,
+                    'price': round(4.5 + index % 20, 2),
+                    'created_at': now,
+                }
+                for index in range(start, min(item_count, start + 1000))
+            ]
+        )
+    return str(restaurant_id), email
+
+
+async def drive(
+    send: Callable[[], Awaitable[Any]], total: int, concurrency: int
+) -> Tuple[List[float], Dict[str, int], float]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker() -> None:
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await send()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    # Peak of this process, which runs a single scenario; ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+async def run_tenant(client: Any, args: argparse.Namespace, size: int, with_images: bool) -> List[Dict[str, Any]]:
+    restaurant_id, email = await seed_tenant(size, with_images)
+    login = await client.post('/auth/login', json={'email': email, 'password': PASSWORD})
+    login.raise_for_status()
+    auth = {'Authorization': f"Bearer {login.json()['access_token']}"}
+
+    requests = {
+        'public_menu': lambda: client.get(f'/public/menu/{restaurant_id}'),
+        'list_my_menu_items': lambda: client.get('/menu/items', headers=auth),
+        'login': lambda: client.post('/auth/login', json={'email': email, 'password': PASSWORD}),
+        'restaurant_qr': lambda: client.get('/restaurant/qr', headers=auth),
+    }
+    results = []
+    for scenario in args.scenarios.split(','):
+        total = args.login_requests if scenario == 'login' else args.requests
+        latencies, statuses, elapsed = await drive(requests[scenario], total, args.concurrency)
+        result = {
+            'tenant_items': size,
+            'images': 'inline' if with_images else 'none',
+            'scenario': scenario,
+            'requests': total,
+            'concurrency': args.concurrency,
+            'statuses': statuses,
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'throughput_rps': round(total / elapsed, 1),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        results.append(result)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+async def run_worker(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    if not args.mongo_uri:
+        from benchmarks import mongo_stub
+
+        mongo_stub.install()
+
+    import httpx
+
+    from app.core.database import close_client
+    from app.core.images import shutdown_image_workers
+    from app.main import app
+    from app.migrations import run_migrations
+    from app.services.passwords import shutdown_password_workers
+
+    await run_migrations()
+    image_modes = {'none': [False], 'inline': [True], 'both': [False, True]}[args.images]
+    results: List[Dict[str, Any]] = []
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            for size in [int(value) for value in args.sizes.split(',') if value]:
+                for with_images in image_modes:
+                    results.extend(await run_tenant(client, args, size, with_images))
+    finally:
+        shutdown_image_workers()
+        shutdown_password_workers()
+        await close_client()
+    return results
+
+
+def run_scenario(args: argparse.Namespace, size: int, images: str, scenario: str) -> Dict[str, Any]:
+    command = [
+        sys.executable, '-m', 'benchmarks.load', '--worker',
+        '--sizes', str(size),
+        '--images', images,
+        '--scenarios', scenario,
+        '--requests', str(args.requests),
+        '--concurrency', str(args.concurrency),
+        '--login-requests', str(args.login_requests),
+    ]
+    if args.mongo_uri:
+        command += ['--mongo-uri', args.mongo_uri]
+    completed = subprocess.run(command, cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True)
+    if completed.returncode:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f'{scenario} ({size} items, images {images}) failed')
+    result = json.loads(completed.stdout.splitlines()[-1])
+    print(
+        f"{size:>6} items {result['images']:<6} {scenario:<20} p50 {result['p50_ms']:8.2f}ms "
+        f"p95 {result['p95_ms']:8.2f}ms p99 {result['p99_ms']:8.2f}ms {result['throughput_rps']:8.1f} rps "
+        f"rss {result['peak_rss_mb']}MB {result['statuses']}"
+    )
+    return result
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    image_modes = {'none': ['none'], 'inline': ['inline'], 'both': ['none', 'inline']}[args.images]
+    results = [
+        run_scenario(args, size, images, scenario)
+        for size in [int(value) for value in args.sizes.split(',') if value]
+        for images in image_modes
+        for scenario in args.scenarios.split(',')
+    ]
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': 'mongod' if args.mongo_uri else 'mongomock',
+            'rss': 'per scenario',
+            'args': vars(args),
+        },
+        'results': results,
+    }
+
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    if args.worker:
+        configure_environment(args)
+        print(json.dumps(asyncio.run(run_worker(args))[0]))
+        return
+    report = run(args)
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        print(f'Saved {len(report["results"])} results to {output}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,208 @@
+"""Async in-memory stand-in for the parts of AsyncMongoClient the app uses, backed by mongomock."""
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import mongomock
+import pymongo
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult
+
+from app.core.telemetry import mongo_command_duration_seconds
+
+# Wire protocol command each collection method sends, so the stub reports round trips like MongoCommandMetrics.
+COMMANDS = {
+    'insert_one': 'insert',
+    'insert_many': 'insert',
+    'find_one': 'find',
+    'find_one_and_update': 'findAndModify',
+    'find_one_and_replace': 'findAndModify',
+    'find_one_and_delete': 'findAndModify',
+    'update_one': 'update',
+    'update_many': 'update',
+    'replace_one': 'update',
+    'delete_one': 'delete',
+    'delete_many': 'delete',
+    'count_documents': 'aggregate',
+    'distinct': 'distinct',
+    'create_index': 'createIndexes',
+}
+
+
+# (task, commands) per open recording().
+_recordings: List[Tuple[Any, List[str]]] = []
+
+
+def record_command(collection: str, command: str) -> None:
+    mongo_command_duration_seconds.labels(collection, command, 'success').observe(0.0)
+    if _recordings:
+        task = asyncio.current_task()
+        for owner, commands in _recordings:
+            if owner is task:
+                commands.append(f'{collection}.{command}')
+
+
+@contextmanager
+def recording() -> Iterator[List[str]]:
+    # Collects 'collection.command' for each command the current task sends. Work it hands to other
+    # tasks (menu rebuilds, image variants) is left out, as it is off the request path.
+    recorded: Tuple[Any, List[str]] = (asyncio.current_task(), [])
+    _recordings.append(recorded)
+    try:
+        yield recorded[1]
+    finally:
+        _recordings.remove(recorded)
+
+
+def write_command(request: Any) -> str:
+    if isinstance(request, pymongo.InsertOne):
+        return 'insert'
+    if isinstance(request, (pymongo.DeleteOne, pymongo.DeleteMany)):
+        return 'delete'
+    return 'update'
+
+
+class StubCursor:
+    def __init__(self, cursor: Any, collection: str, command: str) -> None:
+        self._cursor = cursor
+        self._iterator = None
+        self._collection = collection
+        self._command = command
+
+    def sort(self, *args: Any, **kwargs: Any) -> 'StubCursor':
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count: int) -> 'StubCursor':
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def skip(self, count: int) -> 'StubCursor':
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def batch_size(self, size: int) -> 'StubCursor':
+        return self
+
+    def hint(self, *args: Any) -> 'StubCursor':
+        return self
+
+    def __aiter__(self) -> 'StubCursor':
+        record_command(self._collection, self._command)
+        self._iterator = iter(self._cursor)
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Any = None) -> List[Dict[str, Any]]:
+        record_command(self._collection, self._command)
+        return list(self._cursor)
+
+    async def close(self) -> None:
+        pass
+
+
+class StubCollection:
+    def __init__(self, collection: Any) -> None:
+        self._collection = collection
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    def __getattr__(self, attr: str) -> Any:
+        method = getattr(self._collection, attr)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            if attr in COMMANDS:
+                record_command(self.name, COMMANDS[attr])
+            return method(*args, **kwargs)
+
+        return call
+
+    def find(self, *args: Any, **kwargs: Any) -> StubCursor:
+        return StubCursor(self._collection.find(*args, **kwargs), self.name, 'find')
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> StubCursor:
+        return StubCursor(iter(list(self._collection.aggregate(pipeline, **kwargs))), self.name, 'aggregate')
+
+    async def watch(self, *args: Any, **kwargs: Any) -> Any:
+        # Answer like a standalone mongod so callers fall back to polling.
+        raise OperationFailure('The $changeStream stage is only supported on replica sets', 40573)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs: Any) -> BulkWriteResult:
+        # mongomock's bulk builder predates PyMongo 4.13's write models, so replay them one by one.
+        counts: Dict[str, Any] = {'nInserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'nUpserted': 0, 'upserted': []}
+        errors = []
+        # The driver batches consecutive operations of one type into a single command.
+        commands = [write_command(request) for request in requests]
+        for index, command in enumerate(commands):
+            if index == 0 or command != commands[index - 1]:
+                record_command(self.name, command)
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, pymongo.InsertOne):
+                    self._collection.insert_one(request._doc)
+                    counts['nInserted'] += 1
+                elif isinstance(request, (pymongo.UpdateOne, pymongo.UpdateMany, pymongo.ReplaceOne)):
+                    method = {
+                        pymongo.UpdateOne: self._collection.update_one,
+                        pymongo.UpdateMany: self._collection.update_many,
+                        pymongo.ReplaceOne: self._collection.replace_one,
+                    }[type(request)]
+                    result = method(request._filter, request._doc, upsert=request._upsert)
+                    counts['nMatched'] += result.matched_count
+                    counts['nModified'] += result.modified_count
+                    if result.upserted_id is not None:
+                        counts['nUpserted'] += 1
+                        counts['upserted'].append({'index': index, '_id': result.upserted_id})
+                elif isinstance(request, pymongo.DeleteOne):
+                    counts['nRemoved'] += self._collection.delete_one(request._filter).deleted_count
+                elif isinstance(request, pymongo.DeleteMany):
+                    counts['nRemoved'] += self._collection.delete_many(request._filter).deleted_count
+            except DuplicateKeyError as exc:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(exc)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, **counts})
+        return BulkWriteResult(counts, True)
+
+
+class StubDatabase:
+    def __init__(self, database: Any) -> None:
+        self._database = database
+
+    def __getitem__(self, name: str) -> StubCollection:
+        return StubCollection(self._database[name])
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._database, attr)
+
+
+class StubClient:
+    # One shared store per process so reconnecting after close_client() keeps the seeded data.
+    _store = mongomock.MongoClient()
+
+    def __init__(self, uri: str = '', **kwargs: Any) -> None:
+        pass
+
+    def get_default_database(self, default: str = 'MenuApp') -> StubDatabase:
+        return StubDatabase(self._store[default])
+
+    def __getitem__(self, name: str) -> StubDatabase:
+        return StubDatabase(self._store[name])
+
+    async def close(self) -> None:
+        pass
+
+
+def install() -> None:
+    import app.core.database as database
+
+    database.AsyncMongoClient = StubClient
+    database.MongoClient = mongomock.MongoClient
@@ -0,0 +1,82 @@
+"""Per-item cost of turning menu item documents into JSON response bytes.
+
+Compares the previous path (Pydantic response model -> model_dump -> jsonable_encoder ->
+stdlib json) with the direct document -> dict -> orjson path used by the routers.
+
+    python -m benchmarks.serialization [--items 1000] [--repeat 7]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas.item import MenuItemResponse
+from app.services.serializers import menu_item_response
+
+
+def make_item_docs(count: int):
+    restaurant_id = ObjectId()
+    return [
+        {
+            '_id': ObjectId(),
+            'restaurant_id': restaurant_id,
+            'category_id': ObjectId(),
+            'category': f'Category {index % 12}',
+            'name': f'Menu item {index}',
+            'description': 'Slow-cooked with seasonal vegetables and a house spice blend.',
+            'image_url': f'/blobs/{index:064x}',
+            'price': 4.5 + index % 20,
+            'created_at': datetime.now(timezone.utc),
+        }
+        for index in range(count)
+    ]
+
+
+def pydantic_path(docs):
+    items = [
+        MenuItemResponse(
+            id=str(doc['_id']),
+            restaurant_id=str(doc['restaurant_id']),
+            name=doc['name'],
+            category=doc['category'],
+            description=doc.get('description', ''),
+            image_url=doc.get('image_url', ''),
+            price=float(doc['price']),
+        ).model_dump()
+        for doc in docs
+    ]
+    return json.dumps(jsonable_encoder({'items': items}), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def orjson_path(docs):
+    return orjson.dumps({'items': [menu_item_response(doc) for doc in docs]})
+
+
+def per_item_microseconds(func, docs, repeat: int) -> float:
+    number = max(1, 20_000 // len(docs))
+    best = min(timeit.repeat(lambda: func(docs), number=number, repeat=repeat))
+    return best / number / len(docs) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    docs = make_item_docs(args.items)
+    assert json.loads(pydantic_path(docs)) == json.loads(orjson_path(docs))
+
+    before = per_item_microseconds(pydantic_path, docs, args.repeat)
+    after = per_item_microseconds(orjson_path, docs, args.repeat)
+    print(f'{args.items} items per response')
+    print(f'pydantic + json : {before:7.2f} us/item')
+    print(f'dict + orjson   : {after:7.2f} us/item  ({before / after:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
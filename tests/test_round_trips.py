@@ -0,0 +1,163 @@
+"""Each owner write is one command on the collection it changes plus the menu version bump.
+
+Runs against the in-memory MongoDB stand-in in benchmarks/mongo_stub.py and counts only the commands
+a request waits on; background menu rebuilds and image variants are left out.
+"""
+import asyncio
+import os
+import tempfile
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List
+
+import pytest
+
+# Settings are read when the app is imported.
+os.environ['BLOB_BACKEND'] = 'filesystem'
+os.environ['BLOB_STORAGE_DIR'] = tempfile.mkdtemp(prefix='menu-test-blobs-')
+
+from benchmarks import mongo_stub  # noqa: E402
+
+mongo_stub.install()
+
+import httpx  # noqa: E402
+
+from app.core.database import close_client, users_col  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.services.menu import flush_menu_rebuilds  # noqa: E402
+from app.services.passwords import shutdown_password_workers  # noqa: E402
+
+PASSWORD = 'Test-Passw0rd!'
+MENU_VERSION_BUMP = 'users.findAndModify'
+
+# The one write each endpoint exists for, as 'collection.command'; selecting a template writes the
+# restaurant itself, inside the version bump.
+WRITES: Dict[str, List[str]] = {
+    'create_category': ['menu_categories.insert'],
+    'update_category': ['menu_categories.findAndModify'],
+    'rename_category': ['menu_categories.findAndModify'],
+    'delete_category': ['menu_categories.findAndModify'],
+    'create_item': ['menu_items.insert'],
+    'update_item': ['menu_items.findAndModify'],
+    'delete_item': ['menu_items.delete'],
+    'create_template': ['menu_templates.insert'],
+    'update_template': ['menu_templates.findAndModify'],
+    'select_template': [],
+    'delete_template': ['menu_templates.delete'],
+}
+
+# Commands on a second collection, which no single write can fold in.
+UNFOLDABLE: Dict[str, List[str]] = {
+    # Items store their category's id, looked up by the name the client sends.
+    'create_item': ['menu_categories.find'],
+    'update_item': ['menu_categories.find'],
+    # Items written before category ids existed are pinned to the id before the name they go by changes.
+    'rename_category': ['menu_items.update'],
+    # A category's items go with it.
+    'delete_category': ['menu_items.delete'],
+    # A custom template must exist before the restaurant points at it.
+    'select_template': ['menu_templates.find'],
+}
+
+
+async def _register(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    registered = await client.post(
+        '/auth/register', json={'email': email, 'password': PASSWORD, 'restaurant_name': 'Round trips'}
+    )
+    registered.raise_for_status()
+    login = await client.post('/auth/login', json={'email': email, 'password': PASSWORD})
+    login.raise_for_status()
+    return {'Authorization': f"Bearer {login.json()['access_token']}"}
+
+
+async def _run_endpoints(client: httpx.AsyncClient) -> Dict[str, List[str]]:
+    auth = await _register(client, 'round-trips@example.com')
+    issued: Dict[str, List[str]] = {}
+
+    async def measure(name: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        # Template selection drops the cached principal; reload it first so only the write is counted.
+        (await client.get('/auth/me', headers=auth)).raise_for_status()
+        with mongo_stub.recording() as commands:
+            response = await send()
+        response.raise_for_status()
+        issued[name] = commands
+        return response
+
+    category = await measure(
+        'create_category', lambda: client.post('/menu/categories', json={'name': 'Starters'}, headers=auth)
+    )
+    category_id = category.json()['id']
+    await measure(
+        'update_category',
+        lambda: client.put(
+            f'/menu/categories/{category_id}', json={'name': 'Starters', 'description': 'Small plates'}, headers=auth
+        ),
+    )
+    item_payload = {'name': 'Soup', 'description': '', 'price': 6.5, 'category': 'Starters'}
+    item = await measure('create_item', lambda: client.post('/menu/items', json=item_payload, headers=auth))
+    item_id = item.json()['id']
+    await measure(
+        'update_item', lambda: client.put(f'/menu/items/{item_id}', json={**item_payload, 'price': 7.0}, headers=auth)
+    )
+    await measure(
+        'rename_category',
+        lambda: client.put(f'/menu/categories/{category_id}', json={'name': 'Small plates'}, headers=auth),
+    )
+    await measure('delete_item', lambda: client.delete(f'/menu/items/{item_id}', headers=auth))
+
+    template = await measure(
+        'create_template', lambda: client.post('/restaurant/templates', json={'name': 'House style'}, headers=auth)
+    )
+    template_id = template.json()['id']
+    await measure(
+        'update_template',
+        lambda: client.put(f'/restaurant/templates/{template_id}', json={'name': 'House style 2'}, headers=auth),
+    )
+    await measure(
+        'select_template', lambda: client.put('/restaurant/template', json={'template_id': template_id}, headers=auth)
+    )
+    await measure('delete_template', lambda: client.delete(f'/restaurant/templates/{template_id}', headers=auth))
+    await measure('delete_category', lambda: client.delete(f'/menu/categories/{category_id}', headers=auth))
+    return issued
+
+
+async def _stale_selection_reset(client: httpx.AsyncClient) -> Dict[str, Any]:
+    # The template is selected behind the cached principal's back, as another worker would.
+    auth = await _register(client, 'template-reset@example.com')
+    (await client.get('/auth/me', headers=auth)).raise_for_status()
+    template = (await client.post('/restaurant/templates', json={'name': 'Selected elsewhere'}, headers=auth)).json()
+    await users_col.update_one({'email': 'template-reset@example.com'}, {'$set': {'template_id': template['id']}})
+    deleted = await client.delete(f"/restaurant/templates/{template['id']}", headers=auth)
+    deleted.raise_for_status()
+    stored = await users_col.find_one({'email': 'template-reset@example.com'}, {'template_id': 1})
+    return {'response': deleted.json(), 'stored': stored}
+
+
+async def _run() -> Dict[str, Any]:
+    await run_migrations()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return {'issued': await _run_endpoints(client), 'reset': await _stale_selection_reset(client)}
+    finally:
+        await flush_menu_rebuilds()
+        shutdown_password_workers()
+        await close_client()
+
+
+@pytest.fixture(scope='module')
+def results() -> Dict[str, Any]:
+    return asyncio.run(_run())
+
+
+@pytest.mark.parametrize('name', sorted(WRITES))
+def test_write_stays_within_its_round_trips(results: Dict[str, Any], name: str) -> None:
+    allowed = WRITES[name] + UNFOLDABLE.get(name, []) + [MENU_VERSION_BUMP]
+    issued = results['issued'][name]
+    assert not Counter(issued) - Counter(allowed), f'{name} sent {issued}, allowed {allowed}'
+
+
+def test_deleting_the_selected_template_resets_the_stored_selection(results: Dict[str, Any]) -> None:
+    reset = results['reset']
+    assert reset['stored']['template_id'] == 'classic-blue'
+    assert reset['response']['user']['template_id'] == 'classic-blue'